@@ -1,15 +1,108 @@
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics
+from phone import gateway_number
+from session_pool import SessionPool
+
+RETRY_STATUS_CODES = {500, 502, 503, 504}
 
 class ApiClient:
-    def __init__(self, base_url):
+    def __init__(self, base_url, pool_size=10, max_retries=3, backoff=0.5, max_backoff=30, timeout=10, cache=None,
+                 token_store=None):
         self.base_url = base_url
         self.token = None
+        self.username = None
+        self.cache = cache
+        self.token_store = token_store
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        # One keep-alive session for every call, so checks reuse TCP/TLS connections.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _backoff_delay(self, attempt):
+        # Full jitter: a random delay up to the exponential cap.
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _retry_after_delay(self, response, attempt):
+        value = response.headers.get("Retry-After")
+        if value:
+            try:
+                return min(self.max_backoff, max(0.0, float(value)))
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(value)
+                    return min(self.max_backoff, max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds()))
+                except (TypeError, ValueError):
+                    pass
+        return self._backoff_delay(attempt)
+
+    def _request(self, method, url, **kwargs):
+        """Sends a request, retrying connection errors, 5xx and 429 responses."""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if last_attempt: raise
+                delay = self._backoff_delay(attempt)
+                print(f"Request to {url} failed ({e}), retrying in {delay:.1f}s...")
+                metrics.increment("api.retries")
+            else:
+                if last_attempt: return response
+                if response.status_code == 429:
+                    delay = self._retry_after_delay(response, attempt)
+                elif response.status_code in RETRY_STATUS_CODES:
+                    delay = self._backoff_delay(attempt)
+                else:
+                    return response
+                print(f"Request to {url} returned {response.status_code}, retrying in {delay:.1f}s...")
+                metrics.increment("api.retries")
+            time.sleep(delay)
 
     def login(self, username, password):
+        # Drop the old token first, so a failed login leaves none behind to use or save.
+        self.token = None
+        with metrics.timed("api.login"):
+            result = self._login(username, password)
+        if self.token and self.token_store:
+            self.username = username
+            try:
+                self.token_store.save(self.base_url, username, self.token)
+            except OSError as e:
+                print(f"Could not save the gateway token: {e}")
+        return result
+
+    def restore_token(self, username):
+        """Reuses a still-valid token saved by an earlier login. Returns True if one was found."""
+        token = self.token_store.load(self.base_url, username) if self.token_store else None
+        if token:
+            self.token, self.username = token, username
+        return bool(token)
+
+    def _forget_token(self):
+        if not self.token_store or not self.username: return
+        try:
+            self.token_store.forget(self.base_url, self.username)
+        except OSError as e:
+            print(f"Could not remove the saved gateway token: {e}")
+
+    def _login(self, username, password):
         try:
             login_url = f"{self.base_url}/auth/login"
             payload = {"username": username, "password": password}
-            response = requests.post(login_url, json=payload, timeout=10)
+            response = self._request("POST", login_url, json=payload)
             response.raise_for_status()
             data = response.json()
             if data.get("success") and data.get("token"):
@@ -20,19 +113,63 @@ class ApiClient:
         except requests.exceptions.RequestException as e:
             return str(e)
 
-    def is_phone_registered(self, session_name, phone_number, country_code):
+    def is_phone_registered(self, session_name, phone_e164, country_code):
+        """Checks a number in E.164 form (see ``phone.normalize_phone``).
+
+        ``session_name`` may also be a SessionPool, which then picks the session for the check.
+        """
         if not self.token: return None, "You are not logged in.", True
+        if self.cache:
+            cached = self.cache.get(phone_e164, country_code)
+            if cached is not None:
+                metrics.increment("validation_cache.hits")
+                return cached, None, False
+            metrics.increment("validation_cache.misses")
+        if isinstance(session_name, SessionPool):
+            return self._check_on_pool(session_name, phone_e164, country_code)
+        start = time.perf_counter()
+        result = (None, "Check did not complete.", False)
+        try:
+            result = self._check_phone(session_name, phone_e164, country_code)
+        finally:
+            metrics.record("api.is_phone_registered", time.perf_counter() - start, error=result[0] is None)
+        return result
+
+    def _check_on_pool(self, pool, phone_e164, country_code):
+        """Runs the check on a pool session, moving on to another one (up to the pool size) if it fails."""
+        for attempt in range(len(pool.names)):
+            session_name = pool.acquire()
+            start = time.perf_counter()
+            result = (None, "Check did not complete.", False)
+            try:
+                result = self._check_phone(session_name, phone_e164, country_code)
+            finally:
+                elapsed = time.perf_counter() - start
+                metrics.record("api.is_phone_registered", elapsed, error=result[0] is None)
+                # An auth error is about the token, not the session, so it doesn't rest the session.
+                session_error = result[0] is None and not result[2]
+                pool.release(session_name, error=session_error)
+                metrics.record(f"api.session.{session_name}", elapsed, error=session_error)
+            if not session_error:
+                return result
+            if attempt + 1 < len(pool.names):
+                print(f"Check on session '{session_name}' failed ({result[1]}), trying another session...")
+        return result
+
+    def _check_phone(self, session_name, phone_e164, country_code):
         try:
-            check_url = f"{self.base_url}/session/is-registered/{session_name}/{phone_number}"
+            check_url = f"{self.base_url}/session/is-registered/{session_name}/{gateway_number(phone_e164)}"
             params = {"countryCode": country_code}
             headers = {"Authorization": f"Bearer {self.token}"}
-            response = requests.get(check_url, params=params, headers=headers, timeout=10)
+            response = self._request("GET", check_url, params=params, headers=headers)
             response.raise_for_status()
             data = response.json()
             is_registered = data.get("isRegistered", False)
+            if self.cache: self.cache.put(phone_e164, country_code, is_registered)
             return is_registered, None, False
         except requests.exceptions.RequestException as e:
             if e.response is not None and e.response.status_code in [401, 403]:
+                self._forget_token()
                 return None, "Session expired or token is invalid.", True
             else:
-                return None, str(e), False
\ No newline at end of file
+                return None, str(e), False
@@ -0,0 +1,117 @@
+import queue
+import threading
+from concurrent.futures import CancelledError
+
+
+class Task:
+    def __init__(self, tag):
+        self.tag = tag
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class TaskRunner:
+    """Runs blocking network calls on one worker thread and hands results back to Tk.
+
+    Tasks run one at a time in submission order, so the row cache and prefetch
+    pipeline are only ever driven from the worker. Callbacks (``on_done``,
+    ``on_error``, ``on_cancel`` and anything sent with ``post``) always run on the
+    Tk thread, picked up by a ``root.after`` poll loop.
+    """
+
+    def __init__(self, root, poll_interval=30):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._tasks = queue.Queue()
+        self._callbacks = queue.Queue()
+        self._active = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="TaskRunner", daemon=True)
+        self._thread.start()
+        self.root.after(self.poll_interval, self._poll)
+
+    def submit(self, func, *args, on_done=None, on_error=None, on_cancel=None, tag=None, with_cancel=False):
+        """Queues ``func(*args)``. With ``with_cancel`` it also gets ``cancel_event=``."""
+        task = Task(tag)
+        with self._lock:
+            self._active.append(task)
+        self._tasks.put((task, func, args, on_done, on_error, on_cancel, with_cancel))
+        return task
+
+    def spawn(self, func, *args, on_done=None, on_error=None):
+        """Runs ``func(*args)`` on a thread of its own instead of the worker queue.
+
+        For work that never touches the row cache, such as the gateway login, so it
+        can overlap with the sheet setup. Callbacks still run on the Tk thread.
+        """
+        def run():
+            try:
+                result = func(*args)
+            except Exception as e:
+                if on_error: self.post(on_error, e)
+                else: print(f"Background task failed: {e}")
+            else:
+                if on_done: self.post(on_done, result)
+        threading.Thread(target=run, name=f"TaskRunner-{getattr(func, '__name__', 'task')}", daemon=True).start()
+
+    def post(self, callback, *args):
+        """Schedules ``callback(*args)`` on the Tk thread. Safe to call from any thread."""
+        self._callbacks.put((callback, args))
+
+    def is_busy(self, tag=None):
+        with self._lock:
+            return any(tag is None or task.tag == tag for task in self._active)
+
+    def cancel(self, tag=None):
+        with self._lock:
+            for task in self._active:
+                if tag is None or task.tag == tag:
+                    task.cancel()
+
+    def _run(self):
+        while True:
+            item = self._tasks.get()
+            if item is None: return
+            task, func, args, on_done, on_error, on_cancel, with_cancel = item
+            try:
+                if task.cancelled: raise CancelledError()
+                result = func(*args, cancel_event=task.cancel_event) if with_cancel else func(*args)
+                if task.cancelled: raise CancelledError()
+                callback, callback_args = on_done, (result,)
+            except CancelledError:
+                callback, callback_args = on_cancel, ()
+            except Exception as e:
+                callback, callback_args = on_error, (e,)
+                if on_error is None:
+                    print(f"Background task failed: {e}")
+            with self._lock:
+                self._active.remove(task)
+            if callback:
+                self.post(callback, *callback_args)
+
+    def _poll(self):
+        while True:
+            try:
+                callback, args = self._callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"UI callback failed: {e}")
+        if not self._closed:
+            self.root.after(self.poll_interval, self._poll)
+
+    def shutdown(self, timeout=1.0):
+        """Cancels pending work and gives the running task ``timeout`` seconds to finish."""
+        self._closed = True
+        self.cancel()
+        self._tasks.put(None)
+        self._thread.join(timeout)
@@ -0,0 +1,146 @@
+"""Local stand-in for the WhatsApp gateway's login and is-registered endpoints.
+
+Run on its own with ``python -m bench.fake_gateway --port 8765`` and point
+``[API] base_url`` at it, or start it in-process with ``FakeGateway(...).start()``.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class FakeGateway:
+    """Serves ``/auth/login`` and ``/session/is-registered/{session}/{phone}``.
+
+    ``latency``/``jitter`` are seconds added to every response, ``error_rate`` is
+    the share of checks answered with a 503, and ``auth_failure_rate`` the share
+    answered with a 401 (which also revokes the token, like an expired session).
+    A number is reported unregistered for roughly ``invalid_ratio`` of phones,
+    decided by a hash so repeated runs agree.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.05, jitter=0.0, error_rate=0.0,
+                 auth_failure_rate=0.0, invalid_ratio=0.2, username="admin", password="admin123", seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.auth_failure_rate = auth_failure_rate
+        self.invalid_ratio = invalid_ratio
+        self.username = username
+        self.password = password
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.tokens = set()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def is_registered(self, phone):
+        return (zlib.crc32(phone.encode()) % 1000) >= self.invalid_ratio * 1000
+
+    def _roll(self, rate):
+        with self._lock:
+            return self.random.random() < rate
+
+    def _sleep(self):
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _make_handler(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if urlparse(self.path).path != "/auth/login":
+                    return self._reply(404, {"success": False, "message": "Not found"})
+                gateway.calls["login"] += 1
+                gateway._sleep()
+                if body.get("username") != gateway.username or body.get("password") != gateway.password:
+                    return self._reply(200, {"success": False, "message": "Invalid username or password."})
+                token = f"token-{gateway.random.getrandbits(64):x}"
+                with gateway._lock:
+                    gateway.tokens.add(token)
+                self._reply(200, {"success": True, "token": token})
+
+            def do_GET(self):
+                parts = urlparse(self.path).path.strip("/").split("/")
+                if len(parts) != 4 or parts[:2] != ["session", "is-registered"]:
+                    return self._reply(404, {"success": False, "message": "Not found"})
+                gateway.calls["is_registered"] += 1
+                gateway._sleep()
+                token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                if token not in gateway.tokens:
+                    gateway.calls["unauthorized"] += 1
+                    return self._reply(401, {"success": False, "message": "Unauthorized"})
+                if gateway._roll(gateway.auth_failure_rate):
+                    with gateway._lock:
+                        gateway.tokens.discard(token)
+                    gateway.calls["unauthorized"] += 1
+                    return self._reply(401, {"success": False, "message": "Token expired"})
+                if gateway._roll(gateway.error_rate):
+                    gateway.calls["errors"] += 1
+                    return self._reply(503, {"success": False, "message": "Service unavailable"})
+                self._reply(200, {"success": True, "isRegistered": gateway.is_registered(parts[3])})
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="FakeGateway", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local fake of the WhatsApp gateway.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of checks answered with 503")
+    parser.add_argument("--auth-failure-rate", type=float, default=0.0, help="share of checks answered with 401")
+    parser.add_argument("--invalid-ratio", type=float, default=0.2, help="share of numbers reported unregistered")
+    args = parser.parse_args(argv)
+
+    gateway = FakeGateway(port=args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                          auth_failure_rate=args.auth_failure_rate, invalid_ratio=args.invalid_ratio)
+    print(f"Fake gateway listening on {gateway.base_url} (login: {gateway.username}/{gateway.password})")
+    try:
+        gateway.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
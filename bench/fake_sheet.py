@@ -0,0 +1,134 @@
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+
+Cell = namedtuple("Cell", "row col value")
+
+A1_RE = re.compile(r"^([A-Z]+)(\d+)(?::([A-Z]+)(\d*))?$")
+
+
+def column_number(letters):
+    number = 0
+    for ch in letters:
+        number = number * 26 + ord(ch) - 64
+    return number
+
+
+class FakeWorksheet:
+    """In-memory stand-in for the gspread Worksheet calls the app makes.
+
+    Every call sleeps for ``latency`` seconds (simulating a Sheets round-trip) and
+    is counted in ``calls`` by method name.
+    """
+
+    def __init__(self, header, rows, latency=0.0):
+        self.data = [list(header)] + [list(r) for r in rows]
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def generate(cls, num_rows, done_ratio=0.0, latency=0.0,
+                 header=("PHONE NUMBER", "NAMA", "USERNAME", "LAST LOGIN", "TERKIRIM"), extra_columns=0):
+        """Builds a customer sheet; the first ``done_ratio`` of rows are already SENT."""
+        header = list(header) + [f"EXTRA {i}" for i in range(extra_columns)]
+        done_rows = int(num_rows * done_ratio)
+        rows = []
+        for i in range(num_rows):
+            rows.append([f"0812{i:08d}", f"Customer {i}", f"user{i}", "2024-01-01",
+                         "SENT" if i < done_rows else ""] + ["x"] * extra_columns)
+        return cls(header, rows, latency=latency)
+
+    @property
+    def row_count(self):
+        return len(self.data)
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _cell(self, row, col):
+        if row - 1 < len(self.data):
+            values = self.data[row - 1]
+            if col - 1 < len(values):
+                return values[col - 1]
+        return ""
+
+    def _set(self, row, col, value):
+        while len(self.data) < row:
+            self.data.append([])
+        values = self.data[row - 1]
+        while len(values) < col:
+            values.append("")
+        values[col - 1] = value
+
+    def _read_range(self, a1):
+        m = A1_RE.match(a1)
+        if not m:
+            raise ValueError(f"Unsupported range: {a1}")
+        first_col, first_row = column_number(m.group(1)), int(m.group(2))
+        last_col = column_number(m.group(3)) if m.group(3) else first_col
+        last_row = int(m.group(4)) if m.group(4) else (len(self.data) if m.group(3) else first_row)
+        values = []
+        for row in range(first_row, min(last_row, len(self.data)) + 1):
+            cells = [self._cell(row, col) for col in range(first_col, last_col + 1)]
+            while cells and cells[-1] == "":
+                cells.pop()
+            values.append(cells)
+        # Like the Sheets API, trailing empty rows are omitted.
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def row_values(self, row):
+        self._call("row_values")
+        with self._lock:
+            values = list(self.data[row - 1]) if row - 1 < len(self.data) else []
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def col_values(self, col):
+        self._call("col_values")
+        with self._lock:
+            values = [self._cell(row, col) for row in range(1, len(self.data) + 1)]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def batch_get(self, ranges):
+        self._call("batch_get")
+        with self._lock:
+            return [self._read_range(a1) for a1 in ranges]
+
+    def get_all_records(self):
+        self._call("get_all_records")
+        with self._lock:
+            header = self.data[0]
+            return [{h: (r[i] if i < len(r) else "") for i, h in enumerate(header)} for r in self.data[1:]]
+
+    def find(self, query):
+        self._call("find")
+        with self._lock:
+            for r, values in enumerate(self.data, start=1):
+                for c, value in enumerate(values, start=1):
+                    if value == query:
+                        return Cell(r, c, value)
+        return None
+
+    def update_cell(self, row, col, value):
+        self._call("update_cell")
+        with self._lock:
+            self._set(row, col, value)
+
+    def batch_update(self, data):
+        self._call("batch_update")
+        with self._lock:
+            for item in data:
+                m = A1_RE.match(item['range'])
+                row, col = int(m.group(2)), column_number(m.group(1))
+                for r_offset, values in enumerate(item['values']):
+                    for c_offset, value in enumerate(values):
+                        self._set(row + r_offset, col + c_offset, value)
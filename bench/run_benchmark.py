@@ -0,0 +1,142 @@
+"""Benchmarks the customer pipeline against the local gateway and worksheet fakes.
+
+Run from the project folder with ``python -m bench.run_benchmark``. For each sheet
+size it drives the same row cache / prefetch / status writer stack the app uses,
+simulating an operator who marks every registered customer as done, and reports
+customers per minute, p50/p95 time-to-next-customer and API/Sheets call counts.
+"""
+import argparse
+import configparser
+import time
+
+from api_client import ApiClient
+from prefetch import PrefetchValidator
+from sheet_cache import SheetRowCache
+from status_writer import StatusWriter
+
+from bench.fake_gateway import FakeGateway
+from bench.fake_sheet import FakeWorksheet
+
+
+def percentile(values, pct):
+    if not values: return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_config():
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'DEFAULT': {'status_done_text': 'SENT', 'status_invalid_text': 'INVALID'},
+        'API': {'country_code': '62', 'username': 'admin', 'password': 'admin123', 'session': 'bench'},
+        'COLUMNS': {'phone': 'PHONE NUMBER', 'name': 'NAMA', 'id': 'USERNAME',
+                    'last_login': 'LAST LOGIN', 'status': 'TERKIRIM'},
+    })
+    return config
+
+
+def run_scenario(num_rows, args, gateway):
+    config = build_config()
+    columns, api = config['COLUMNS'], config['API']
+    done_text, invalid_text = config['DEFAULT']['status_done_text'], config['DEFAULT']['status_invalid_text']
+    worksheet = FakeWorksheet.generate(num_rows, done_ratio=args.done_ratio, latency=args.sheet_latency)
+    gateway.calls.clear()
+
+    api_client = ApiClient(gateway.base_url, pool_size=max(args.workers, 10))
+    api_client.login(api['username'], api['password'])
+    started = time.perf_counter()
+    row_cache = SheetRowCache(worksheet, columns, [done_text, invalid_text], window_size=args.window_size,
+                              country_code=api['country_code'])
+    row_cache.load()
+    status_writer = StatusWriter(worksheet, row_cache.status_col, flush_interval=args.write_interval)
+    prefetcher = PrefetchValidator(row_cache, api_client, api['country_code'],
+                                   lookahead=args.lookahead, max_workers=args.workers)
+    prefetcher.reset(api['session'])
+
+    def mark(record, status):
+        status_writer.enqueue(record.row_index, status)
+        row_cache.mark(record.row_index, status)
+
+    waits, served, errors, after_row = [], 0, 0, 1
+    while served < args.customers:
+        t0 = time.perf_counter()
+        record, result, last_skipped = prefetcher.next_registered(
+            after_row, on_invalid=lambda r: mark(r, invalid_text))
+        waits.append(time.perf_counter() - t0)
+        if last_skipped:
+            after_row = last_skipped.row_index
+        if record is None:
+            break
+        is_valid, _, is_auth_err = result
+        if is_auth_err:
+            errors += 1
+            api_client.login(api['username'], api['password'])
+            continue
+        if is_valid is None:
+            errors += 1
+            continue
+        if args.think_time:
+            time.sleep(args.think_time)
+        mark(record, done_text)
+        served += 1
+        after_row = record.row_index
+    elapsed = time.perf_counter() - started
+
+    prefetcher.shutdown()
+    failures = status_writer.close()
+    status_col = row_cache.status_col
+    invalid = sum(1 for row in worksheet.data[1:] if len(row) >= status_col and row[status_col - 1] == invalid_text)
+    return {
+        'rows': num_rows,
+        'served': served,
+        'invalid': invalid,
+        'errors': errors,
+        'write_failures': len(failures),
+        'per_minute': served / elapsed * 60 if elapsed else 0.0,
+        'p50_ms': percentile(waits, 50) * 1000,
+        'p95_ms': percentile(waits, 95) * 1000,
+        'api_calls': dict(gateway.calls),
+        'sheet_calls': dict(worksheet.calls),
+    }
+
+
+def print_result(result):
+    api_calls = ", ".join(f"{k}={v}" for k, v in sorted(result['api_calls'].items())) or "-"
+    sheet_calls = ", ".join(f"{k}={v}" for k, v in sorted(result['sheet_calls'].items())) or "-"
+    print(f"{result['rows']:>7} rows | {result['served']:>5} served | {result['per_minute']:>9.1f} customers/min | "
+          f"p50 {result['p50_ms']:>7.1f} ms | p95 {result['p95_ms']:>7.1f} ms | "
+          f"{result['invalid']} invalid, {result['errors']} errors, {result['write_failures']} write failures")
+    print(f"{'':>7}      API: {api_calls}")
+    print(f"{'':>7}      Sheets: {sheet_calls}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the customer pipeline against local fakes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="sheet sizes in rows")
+    parser.add_argument("--customers", type=int, default=200, help="registered customers to serve per sheet")
+    parser.add_argument("--done-ratio", type=float, default=0.5, help="share of rows already SENT at the top")
+    parser.add_argument("--think-time", type=float, default=0.0, help="operator seconds per customer")
+    parser.add_argument("--gateway-latency", type=float, default=0.08)
+    parser.add_argument("--gateway-jitter", type=float, default=0.04)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--auth-failure-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-ratio", type=float, default=0.2)
+    parser.add_argument("--sheet-latency", type=float, default=0.15, help="seconds per Sheets call")
+    parser.add_argument("--window-size", type=int, default=2000)
+    parser.add_argument("--write-interval", type=float, default=2.0)
+    parser.add_argument("--lookahead", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    gateway = FakeGateway(latency=args.gateway_latency, jitter=args.gateway_jitter, error_rate=args.error_rate,
+                          auth_failure_rate=args.auth_failure_rate, invalid_ratio=args.invalid_ratio, seed=1).start()
+    try:
+        for size in args.sizes:
+            print_result(run_scenario(size, args, gateway))
+    finally:
+        gateway.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Headless bulk validation of every pending row in the configured worksheet.
+
+Run with ``python main.py --validate-all`` (or ``python bulk_validate.py``). Numbers
+that are not registered on WhatsApp are written back as INVALID in batches, so the
+operators only see reachable customers the next morning.
+"""
+import argparse
+import asyncio
+import configparser
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_client import ApiClient
+from metrics import metrics
+from session_pool import SessionPool
+from sheet_cache import SheetRowCache, open_worksheet
+from status_writer import StatusWriter
+from validation_cache import ValidationCache
+from token_store import TokenStore
+from write_journal import WriteJournal
+
+
+class TokenBucket:
+    """Async token bucket: allows ``rate`` acquisitions per second with bursts up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0: return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncApiClient:
+    """asyncio front end for ApiClient.
+
+    Calls run on a dedicated thread pool on top of ApiClient's pooled session, so
+    the endpoints, token, retry policy and validation cache are the same ones the
+    desktop app uses.
+    """
+
+    def __init__(self, api_client, max_workers):
+        self.api_client = api_client
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="BulkApi")
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def login(self, username, password):
+        return await self._call(self.api_client.login, username, password)
+
+    async def is_phone_registered(self, session_name, phone_e164, country_code):
+        return await self._call(self.api_client.is_phone_registered, session_name, phone_e164, country_code)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BulkValidator:
+    def __init__(self, config, row_cache, status_writer, api, concurrency=8, rate=5.0, progress_interval=5.0):
+        self.config = config
+        self.row_cache = row_cache
+        self.status_writer = status_writer
+        self.api = api
+        self.concurrency = max(1, int(concurrency))
+        self.bucket = TokenBucket(rate)
+        self.progress_interval = progress_interval
+
+        self.country_code = config['API']['country_code']
+        self.session_name = SessionPool.from_text(
+            config.get('API', 'sessions', fallback='') or config['API']['session'],
+            strategy=config.get('API', 'session_strategy', fallback='round_robin'),
+            cooldown=config.getfloat('API', 'session_cooldown', fallback=60))
+        self.invalid_text = config['DEFAULT']['status_invalid_text']
+        self.duplicate_text = config.get('DEFAULT', 'status_duplicate_text', fallback='DUPLICATE')
+        self.skip_duplicates = config.getboolean('PREFETCH', 'skip_duplicates', fallback=False)
+
+        self.checked = self.registered = self.invalid = self.errors = self.duplicates = 0
+        self._checks = {}
+        self.started_at = None
+        self.fatal_error = None
+        self._login_lock = asyncio.Lock()
+
+    def _next_batch(self, after_row, size=500):
+        batch = []
+        while len(batch) < size:
+            record = self.row_cache.next_pending(after_row)
+            if record is None: break
+            batch.append(record)
+            after_row = record.row_index
+        return batch
+
+    async def _produce(self, queue):
+        after_row = 1
+        while self.fatal_error is None:
+            batch = await asyncio.to_thread(self._next_batch, after_row)
+            if not batch: break
+            for record in batch:
+                await queue.put(record)
+            after_row = batch[-1].row_index
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def _relogin(self, failed_token):
+        async with self._login_lock:
+            if self.api.api_client.token and self.api.api_client.token != failed_token:
+                return True
+            result = await self.api.login(self.config['API']['username'], self.config['API']['password'])
+            # No token, or the one that was just rejected: the login did not work.
+            if self.api.api_client.token in (None, failed_token):
+                self.fatal_error = f"Login failed: {result}"
+                return False
+            return True
+
+    async def _check(self, record):
+        """Checks the record's normalized number; duplicate rows share one check."""
+        phone = record.phone_e164
+        if not phone:
+            return False, "No phone number."
+        check = self._checks.get(phone)
+        if check is None:
+            check = self._checks[phone] = asyncio.ensure_future(self._check_number(phone))
+        return await check
+
+    async def _check_number(self, phone_e164):
+        for _ in range(2):
+            await self.bucket.acquire()
+            token = self.api.api_client.token
+            is_valid, err_msg, is_auth_err = await self.api.is_phone_registered(self.session_name, phone_e164, self.country_code)
+            if not is_auth_err:
+                return is_valid, err_msg
+            if not await self._relogin(token):
+                break
+        return None, err_msg
+
+    async def _work(self, queue):
+        while True:
+            record = await queue.get()
+            if record is None: return
+            if self.fatal_error is not None: continue
+            if self.skip_duplicates and self.row_cache.is_duplicate(record):
+                self.duplicates += 1
+                self.status_writer.enqueue(record.row_index, self.duplicate_text)
+                self.row_cache.mark(record.row_index, self.duplicate_text)
+                continue
+            is_valid, err_msg = await self._check(record)
+            self.checked += 1
+            if is_valid:
+                self.registered += 1
+            elif is_valid is None:
+                self.errors += 1
+                print(f"Row {record.row_index}: could not check {record.phone}: {err_msg}")
+            else:
+                self.invalid += 1
+                self.status_writer.enqueue(record.row_index, self.invalid_text)
+                self.row_cache.mark(record.row_index, self.invalid_text)
+
+    def _print_progress(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        print(f"{self.checked} rows checked ({self.checked / elapsed:.1f} rows/sec): "
+              f"{self.registered} registered, {self.invalid} invalid, {self.duplicates} duplicates, {self.errors} errors, "
+              f"{self.status_writer.pending_count()} writes pending.")
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self._print_progress()
+
+    async def run(self):
+        self.started_at = time.monotonic()
+        if not self.api.api_client.token and not await self._relogin(None):
+            return
+        queue = asyncio.Queue(maxsize=self.concurrency * 4)
+        reporter = asyncio.create_task(self._report_progress())
+        try:
+            await asyncio.gather(self._produce(queue), *(self._work(queue) for _ in range(self.concurrency)))
+        finally:
+            reporter.cancel()
+        self._print_progress()
+        if len(self.session_name.names) > 1:
+            for s in self.session_name.stats():
+                print(f"Session {s['session']}: {s['checks']} checks ({s['per_minute']:.1f}/min), "
+                      f"{s['errors']} errors ({s['error_rate']:.1f}%).")
+
+
+def main(argv=None):
+    config = configparser.ConfigParser()
+    try:
+        with open('config.ini') as f:
+            config.read_file(f)
+    except FileNotFoundError:
+        print("Configuration file 'config.ini' not found.")
+        return 1
+
+    parser = argparse.ArgumentParser(description="Validate every pending phone number in the worksheet.")
+    parser.add_argument("--concurrency", type=int, default=config.getint('BULK', 'concurrency', fallback=8),
+                        help="maximum gateway requests in flight")
+    parser.add_argument("--rate", type=float, default=config.getfloat('BULK', 'rate_per_second', fallback=5),
+                        help="maximum gateway requests per second (0 = unlimited)")
+    args = parser.parse_args(argv)
+
+    validation_cache = None
+    if config.getboolean('CACHE', 'enabled', fallback=True):
+        validation_cache = ValidationCache(
+            config.get('CACHE', 'path', fallback='validation_cache.sqlite3'),
+            positive_ttl=config.getfloat('CACHE', 'positive_ttl_hours', fallback=168) * 3600,
+            negative_ttl=config.getfloat('CACHE', 'negative_ttl_hours', fallback=24) * 3600)
+    api_client = ApiClient(
+        config['API']['base_url'],
+        pool_size=max(args.concurrency, config.getint('API', 'pool_size', fallback=10)),
+        max_retries=config.getint('API', 'max_retries', fallback=3),
+        cache=validation_cache)
+    token_path = config.get('API', 'token_cache', fallback='.gateway_token.json')
+    if token_path:
+        api_client.token_store = TokenStore(token_path, default_ttl=config.getfloat('API', 'token_ttl_hours', fallback=12) * 3600)
+        api_client.restore_token(config['API']['username'])
+
+    worksheet = open_worksheet(config)
+    print("Successfully connected to Google Sheets.")
+    row_cache = SheetRowCache(
+        worksheet, config['COLUMNS'],
+        [config['DEFAULT']['status_done_text'], config['DEFAULT']['status_invalid_text'],
+         config.get('DEFAULT', 'status_duplicate_text', fallback='DUPLICATE')],
+        window_size=config.getint('SHEET', 'window_size', fallback=2000),
+        refresh_interval=config.getfloat('SHEET', 'refresh_interval', fallback=60),
+        country_code=config['API']['country_code'])
+    row_cache.load()
+    journal = None
+    journal_path = config.get('JOURNAL', 'path', fallback='journal.sqlite3')
+    if journal_path:
+        journal = WriteJournal(journal_path, f"{config['DEFAULT']['google_sheet_name']}/{config['DEFAULT']['worksheet_name']}")
+    status_writer = StatusWriter(worksheet, row_cache.status_col,
+                                 flush_interval=config.getfloat('SHEET', 'write_interval', fallback=2.0),
+                                 journal=journal)
+    if journal:
+        for row, status in journal.unflushed():
+            status_writer.enqueue(row, status)
+            row_cache.mark(row, status)
+
+    api = AsyncApiClient(api_client, args.concurrency)
+    validator = BulkValidator(config, row_cache, status_writer, api, concurrency=args.concurrency, rate=args.rate)
+    try:
+        asyncio.run(validator.run())
+    except KeyboardInterrupt:
+        print("Interrupted, writing the results collected so far...")
+    finally:
+        api.close()
+        failures = status_writer.close()
+        if journal: journal.close()
+        if validation_cache: validation_cache.close()
+        export_path = config.get('METRICS', 'export_path', fallback='')
+        if export_path: metrics.export(export_path)
+
+    for row, status, error in failures:
+        print(f"Could not write row {row} status '{status}': {error}")
+    if validator.fatal_error:
+        print(validator.fatal_error)
+        return 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Streams the rendered messages for every pending customer to a CSV or JSON-lines file.
+
+Run with ``python main.py --export-messages messages.csv`` (or ``python
+export_messages.py messages.jsonl``). Rows are read one sheet window at a time and
+written out as they are rendered, so memory use does not grow with the sheet.
+With ``--validated`` only customers whose number is registered on WhatsApp are
+exported; the sheet itself is never changed.
+"""
+import argparse
+import configparser
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from api_client import ApiClient
+from session_pool import SessionPool
+from sheet_cache import SheetRowCache, open_worksheet
+from templates import MessageTemplates, get_time_based_greeting
+from token_store import TokenStore
+from validation_cache import ValidationCache
+
+FIELDS = ("row", "phone", "username", "name", "message_1", "message_2")
+
+
+def parse_send_time(value, now=None):
+    """Parses ``HH:MM`` (today) or ``YYYY-MM-DD HH:MM``; an empty value means now."""
+    now = now or datetime.now()
+    value = (value or "").strip()
+    if not value:
+        return now
+    for fmt in ("%Y-%m-%d %H:%M", "%H:%M"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed if fmt != "%H:%M" else now.replace(hour=parsed.hour, minute=parsed.minute, second=0, microsecond=0)
+    raise ValueError(f"Invalid send time '{value}', expected HH:MM or YYYY-MM-DD HH:MM.")
+
+
+class RegisteredFilter:
+    """Keeps only records whose number is registered, checking up to ``lookahead`` ahead.
+
+    Checks run on ``workers`` threads (through the validation cache first); the
+    in-flight window is bounded, so this streams like the rest of the export.
+    """
+
+    def __init__(self, api_client, sessions, country_code, lookahead=20, workers=4):
+        self.api_client = api_client
+        self.sessions = sessions
+        self.country_code = country_code
+        self.lookahead = max(1, int(lookahead))
+        self.executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="ExportCheck")
+        self.invalid = self.errors = 0
+        self.fatal_error = None
+
+    def _check(self, record):
+        if not record.phone_e164:
+            return False, "No phone number.", False
+        return self.api_client.is_phone_registered(self.sessions, record.phone_e164, self.country_code)
+
+    def _result(self, record, future):
+        is_valid, err_msg, is_auth_err = future.result()
+        if is_auth_err:
+            self.fatal_error = f"Gateway login rejected: {err_msg}"
+        elif is_valid is None:
+            self.errors += 1
+            print(f"Row {record.row_index}: could not check {record.phone}: {err_msg}")
+        elif not is_valid:
+            self.invalid += 1
+        return bool(is_valid)
+
+    def filter(self, records):
+        in_flight = deque()
+        for record in records:
+            in_flight.append((record, self.executor.submit(self._check, record)))
+            while len(in_flight) >= self.lookahead or (in_flight and in_flight[0][1].done()):
+                record, future = in_flight.popleft()
+                if self._result(record, future): yield record
+                if self.fatal_error: return
+        while in_flight:
+            record, future = in_flight.popleft()
+            if self._result(record, future): yield record
+            if self.fatal_error: return
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def render_rows(records, templates, greeting):
+    for record in records:
+        messages = templates.render(record, greeting)
+        yield {"row": record.row_index, "phone": record.phone, "username": record.user_id, "name": record.name,
+               "message_1": messages[1], "message_2": messages[2]}
+
+
+def write_rows(path, rows, fmt, progress_interval=5.0):
+    """Writes ``rows`` to ``path`` as they arrive. Returns the number written."""
+    count, last_report = 0, time.monotonic()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS) if fmt == "csv" else None
+        if writer: writer.writeheader()
+        for row in rows:
+            if writer: writer.writerow(row)
+            else: f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+            if time.monotonic() - last_report >= progress_interval:
+                print(f"{count} messages written...")
+                last_report = time.monotonic()
+    os.replace(tmp_path, path)
+    return count
+
+
+def main(argv=None):
+    config = configparser.ConfigParser()
+    try:
+        with open('config.ini') as f:
+            config.read_file(f)
+    except FileNotFoundError:
+        print("Configuration file 'config.ini' not found.")
+        return 1
+
+    parser = argparse.ArgumentParser(description="Export the rendered messages for every pending customer.")
+    parser.add_argument("output", help="output file; .jsonl writes JSON lines, anything else CSV")
+    parser.add_argument("--send-time", default=config.get('EXPORT', 'send_time', fallback=''),
+                        help="when the messages will be sent (HH:MM or 'YYYY-MM-DD HH:MM'), for the greeting word")
+    parser.add_argument("--validated", action="store_true",
+                        default=config.getboolean('EXPORT', 'validated', fallback=False),
+                        help="only export customers whose number is registered on WhatsApp")
+    args = parser.parse_args(argv)
+
+    try:
+        templates = MessageTemplates.from_config(config)
+        send_time = parse_send_time(args.send_time)
+    except ValueError as e:
+        print(e)
+        return 1
+    greeting = get_time_based_greeting(send_time)
+    print(f"Rendering messages for {send_time:%Y-%m-%d %H:%M} (greeting '{greeting}').")
+
+    worksheet = open_worksheet(config)
+    row_cache = SheetRowCache(
+        worksheet, config['COLUMNS'],
+        [config['DEFAULT']['status_done_text'], config['DEFAULT']['status_invalid_text'],
+         config.get('DEFAULT', 'status_duplicate_text', fallback='DUPLICATE')],
+        window_size=config.getint('SHEET', 'window_size', fallback=2000),
+        # Each window is read once, front to back.
+        refresh_interval=float("inf"),
+        country_code=config['API']['country_code'])
+    row_cache.load()
+    records = row_cache.iter_pending(keep=False)
+
+    checker = validation_cache = None
+    if args.validated:
+        if config.getboolean('CACHE', 'enabled', fallback=True):
+            validation_cache = ValidationCache(
+                config.get('CACHE', 'path', fallback='validation_cache.sqlite3'),
+                positive_ttl=config.getfloat('CACHE', 'positive_ttl_hours', fallback=168) * 3600,
+                negative_ttl=config.getfloat('CACHE', 'negative_ttl_hours', fallback=24) * 3600)
+        workers = config.getint('PREFETCH', 'workers', fallback=4)
+        api_client = ApiClient(config['API']['base_url'],
+                               pool_size=max(workers, config.getint('API', 'pool_size', fallback=10)),
+                               max_retries=config.getint('API', 'max_retries', fallback=3), cache=validation_cache)
+        token_path = config.get('API', 'token_cache', fallback='.gateway_token.json')
+        if token_path:
+            api_client.token_store = TokenStore(token_path, default_ttl=config.getfloat('API', 'token_ttl_hours', fallback=12) * 3600)
+        if not api_client.restore_token(config['API']['username']):
+            result = api_client.login(config['API']['username'], config['API']['password'])
+            if not api_client.token:
+                print(f"Login failed: {result}")
+                return 1
+        sessions = SessionPool.from_text(
+            config.get('API', 'sessions', fallback='') or config['API']['session'],
+            strategy=config.get('API', 'session_strategy', fallback='round_robin'),
+            cooldown=config.getfloat('API', 'session_cooldown', fallback=60))
+        checker = RegisteredFilter(api_client, sessions, config['API']['country_code'],
+                                   lookahead=config.getint('PREFETCH', 'lookahead', fallback=10) * 2, workers=workers)
+        records = checker.filter(records)
+
+    fmt = "jsonl" if args.output.lower().endswith(".jsonl") else "csv"
+    started = time.monotonic()
+    try:
+        count = write_rows(args.output, render_rows(records, templates, greeting), fmt)
+    finally:
+        if checker: checker.close()
+        if validation_cache: validation_cache.close()
+    print(f"Wrote {count} messages to {args.output} in {time.monotonic() - started:.1f}s.")
+    if checker:
+        print(f"Left out {checker.invalid} unregistered numbers; {checker.errors} could not be checked.")
+        if checker.fatal_error:
+            print(checker.fatal_error)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import getpass
+import socket
+import sqlite3
+import threading
+import time
+
+from sheet_cache import column_letter
+
+
+def default_operator_id():
+    """``host/user`` of this machine; set [LEASES] operator to run two instances as one user."""
+    return f"{socket.gethostname()}/{getpass.getuser()}"
+
+
+class SQLiteLeaseBackend:
+    """Lease table in a SQLite file.
+
+    Every instance pointing at the same file (on one machine, or on a shared
+    drive that supports file locking) sees the same leases.
+    """
+
+    def __init__(self, path, sheet_key):
+        self.sheet_key = sheet_key
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS row_leases ("
+            " sheet TEXT NOT NULL,"
+            " block INTEGER NOT NULL,"
+            " operator TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (sheet, block))")
+
+    def claim(self, block, operator, ttl):
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two operators can't both see the block as free.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT operator, expires_at FROM row_leases WHERE sheet = ? AND block = ?",
+                                         (self.sheet_key, block)).fetchone()
+                now = time.time()
+                if row is not None and row[0] != operator and row[1] > now:
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO row_leases (sheet, block, operator, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.sheet_key, block, operator, now + ttl))
+                return True
+            finally:
+                self._conn.execute("COMMIT")
+
+    def release(self, block, operator):
+        with self._lock:
+            self._conn.execute("DELETE FROM row_leases WHERE sheet = ? AND block = ? AND operator = ?",
+                               (self.sheet_key, block, operator))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SheetLeaseBackend:
+    """Leases kept in a claim column of the worksheet itself.
+
+    The first row of each block holds ``operator|expiry`` in ``claim_header``.
+    Sheets has no compare-and-set, so a claim is written only if the cell is
+    free and then read back after ``settle`` seconds; if another operator
+    wrote in between, whoever's value stuck keeps the block.
+    """
+
+    def __init__(self, worksheet, claim_header, settle=1.0):
+        self.worksheet = worksheet
+        self.settle = settle
+        header_row = worksheet.row_values(1)
+        if claim_header not in header_row:
+            raise ValueError(f"Claim column '{claim_header}' not found in sheet header.")
+        self.col_letter = column_letter(header_row.index(claim_header) + 1)
+
+    def _read(self, block):
+        values = self.worksheet.batch_get([f"{self.col_letter}{block}"])[0]
+        value = str(values[0][0]).strip() if values and values[0] else ""
+        operator, _, expires_at = value.rpartition("|")
+        try:
+            return operator, float(expires_at)
+        except ValueError:
+            return "", 0.0
+
+    def _write(self, block, value):
+        self.worksheet.batch_update([{'range': f"{self.col_letter}{block}", 'values': [[value]]}])
+
+    def claim(self, block, operator, ttl):
+        holder, expires_at = self._read(block)
+        if holder and holder != operator and expires_at > time.time():
+            return False
+        self._write(block, f"{operator}|{time.time() + ttl:.0f}")
+        if holder == operator:
+            return True
+        time.sleep(self.settle)
+        return self._read(block)[0] == operator
+
+    def release(self, block, operator):
+        if self._read(block)[0] == operator:
+            self._write(block, "")
+
+    def close(self):
+        pass
+
+
+class LeaseManager:
+    """Hands this operator blocks of ``block_size`` rows so several instances can work one sheet.
+
+    A block is claimed from ``backend`` the first time one of its rows is about
+    to be shown or validated. Claims expire after ``ttl`` seconds, so the rows of
+    an operator who disappears go back to the pool; ``renew`` keeps the blocks
+    at and after the operator's current row alive and releases the ones behind it.
+
+    A backend is any object with ``claim(block, operator, ttl) -> bool``,
+    ``release(block, operator)`` and ``close()``; ``block`` is the block's first row.
+    """
+
+    def __init__(self, backend, operator, block_size=50, ttl=900):
+        self.backend = backend
+        self.operator = operator
+        self.block_size = max(1, int(block_size))
+        self.ttl = float(ttl)
+        self.held = {}
+        self._lock = threading.Lock()
+
+    def block_of(self, row):
+        return 2 + ((row - 2) // self.block_size) * self.block_size
+
+    def owns(self, row):
+        """True if this operator holds (or could just claim) the block containing ``row``."""
+        block = self.block_of(row)
+        with self._lock:
+            expires_at = self.held.get(block)
+            if expires_at is not None and expires_at - time.time() > self.ttl / 2:
+                return True
+            if self.backend.claim(block, self.operator, self.ttl):
+                self.held[block] = time.time() + self.ttl
+                return True
+            self.held.pop(block, None)
+            return False
+
+    def renew(self, current_row=None):
+        """Extends the held blocks from ``current_row``'s block onwards and releases earlier ones."""
+        current_block = self.block_of(current_row) if current_row else None
+        with self._lock:
+            for block in sorted(self.held):
+                if current_block is not None and block < current_block:
+                    self.backend.release(block, self.operator)
+                    del self.held[block]
+                elif self.backend.claim(block, self.operator, self.ttl):
+                    self.held[block] = time.time() + self.ttl
+                else:
+                    print(f"Lost the lease on rows {block}-{block + self.block_size - 1}.")
+                    del self.held[block]
+
+    def release_all(self):
+        with self._lock:
+            for block in list(self.held):
+                try:
+                    self.backend.release(block, self.operator)
+                except Exception as e:
+                    print(f"Could not release the lease on row {block}: {e}")
+            self.held.clear()
+
+    def close(self):
+        self.release_all()
+        self.backend.close()
+
+
+class LeasedRowCache:
+    """Wraps a SheetRowCache so ``next_pending`` only returns rows in blocks this operator holds.
+
+    Blocks held by other operators are skipped as a whole and remembered; once
+    the rows after them run out, the skipped blocks are tried again, so rows
+    left behind by an operator whose lease expired are still picked up.
+    Everything else is passed through to the wrapped cache.
+    """
+
+    def __init__(self, row_cache, leases):
+        self._row_cache = row_cache
+        self.leases = leases
+        self.skipped_blocks = set()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._row_cache, name)
+
+    def next_pending(self, after_row=1):
+        while True:
+            record = self._row_cache.next_pending(after_row)
+            if record is None:
+                return self._retry_skipped()
+            block = self.leases.block_of(record.row_index)
+            if self.leases.owns(record.row_index):
+                with self._lock:
+                    self.skipped_blocks.discard(block)
+                return record
+            with self._lock:
+                self.skipped_blocks.add(block)
+            after_row = block + self.leases.block_size - 1
+
+    def _retry_skipped(self):
+        """First pending row in a skipped block that can now be claimed, or None."""
+        with self._lock:
+            blocks = sorted(self.skipped_blocks)
+        for block in blocks:
+            record = self._row_cache.next_pending(block - 1)
+            if record is not None and record.row_index >= block + self.leases.block_size:
+                record = None  # Nothing pending there any more: the other operator finished it.
+            if record is not None and not self.leases.owns(record.row_index):
+                continue
+            with self._lock:
+                self.skipped_blocks.discard(block)
+            if record is not None:
+                return record
+        return None
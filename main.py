@@ -1,18 +1,30 @@
 # WhatsApp Helper - V5.1 (UI Layout Adjustment)
 import tkinter as tk
 from tkinter import messagebox, Listbox, Scrollbar, Toplevel, Label, Entry, Button
-import gspread
 import pyperclip
 import sys
-from datetime import datetime
 import time
 import configparser
-import keyboard
+import importlib.util
 
 from api_client import ApiClient
+from sheet_cache import SheetRowCache, open_worksheet
+from status_writer import StatusWriter
+from prefetch import PrefetchValidator
+from validation_cache import ValidationCache
+from background import TaskRunner
+from metrics import MetricsExporter, metrics
+from session_log import SessionLog
+from write_journal import WriteJournal
+from session_pool import SessionPool
+from token_store import TokenStore
+from templates import MessageTemplates, get_time_based_greeting
+from leases import LeaseManager, LeasedRowCache, SQLiteLeaseBackend, SheetLeaseBackend, default_operator_id
 
 class WhatsAppHelperApp:
     def __init__(self, root):
+        self.started_at = time.perf_counter()
+        self.first_customer_shown = False
         self.root = root
         self.root.title("WhatsApp Helper")
         self.root.geometry("600x650")
@@ -24,39 +36,127 @@ class WhatsAppHelperApp:
         except FileNotFoundError:
             messagebox.showerror("Error", "Configuration file 'config.ini' not found.")
             sys.exit()
+        try:
+            self.templates = MessageTemplates.from_config(self.config)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid message template in config.ini.\n{e}")
+            sys.exit()
 
-        self.api_client = ApiClient(self.config['API']['base_url'])
+        self.validation_cache = None
+        if self.config.getboolean('CACHE', 'enabled', fallback=True):
+            self.validation_cache = ValidationCache(
+                self.config.get('CACHE', 'path', fallback='validation_cache.sqlite3'),
+                positive_ttl=self.config.getfloat('CACHE', 'positive_ttl_hours', fallback=168) * 3600,
+                negative_ttl=self.config.getfloat('CACHE', 'negative_ttl_hours', fallback=24) * 3600)
+
+        self.api_client = ApiClient(
+            self.config['API']['base_url'],
+            pool_size=self.config.getint('API', 'pool_size', fallback=10),
+            max_retries=self.config.getint('API', 'max_retries', fallback=3),
+            cache=self.validation_cache,
+            token_store=self._build_token_store())
         self.api_session_name = None
-
-        self.success_log, self.failed_log = [], []
-        self.log_windows = {}
+        self.session_pool = None
+
+        self.session_log = SessionLog.open(
+            self.config.get('LOGS', 'directory', fallback='logs'),
+            {self.config['DEFAULT']['status_done_text']: "Success", self.config['DEFAULT']['status_invalid_text']: "Failed"},
+            resume=self.config.getboolean('LOGS', 'resume_last_session', fallback=False))
+        self.max_visible_log_items = self.config.getint('LOGS', 'max_visible', fallback=500)
+        self.log_windows, self.log_listboxes = {}, {}
         self.worksheet = None
-        self.current_customer_data = {}
-        self.previous_customer_data = {}
-
+        self.row_cache = None
+        self.status_writer = None
+        self.write_journal = None
+        self.leases = None
+        self.prefetcher = None
+        self.current_customer = None
+        self.previous_customer = None
+        self.awaiting_validation = False
+        self.message_texts = {1: "", 2: ""}
+        self.stats_window = None
+        self.keyboard = None
+
+        self.metrics_exporter = None
+        export_path = self.config.get('METRICS', 'export_path', fallback='')
+        if export_path:
+            self.metrics_exporter = MetricsExporter(
+                metrics, export_path, interval=self.config.getfloat('METRICS', 'export_interval', fallback=60))
+
+        self.runner = TaskRunner(self.root)
         self.setup_gui()
-        self.setup_global_macros()
+        # Hooking the keyboard can take a moment, so let the window paint first.
+        self.root.after_idle(self.setup_global_macros)
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
-        try:
-            self.authenticate_and_load_sheet()
-            self.load_first_customer()
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not initialize app.\nError: {e}")
-            self.on_closing()
+        # The sheet setup and the gateway login don't depend on each other, so they run side by side.
+        self.set_busy("Connecting to Google Sheets...")
+        self.runner.submit(self.authenticate_and_load_sheet, on_done=self._on_sheet_ready,
+                           on_error=self._on_init_error, tag="sheet")
+        self.start_gateway_login()
+
+    def _build_token_store(self):
+        path = self.config.get('API', 'token_cache', fallback='.gateway_token.json')
+        if not path: return None
+        return TokenStore(path, default_ttl=self.config.getfloat('API', 'token_ttl_hours', fallback=12) * 3600)
+
+    def start_gateway_login(self):
+        """Logs in with the saved token, or with the config.ini credentials if ``auto_login`` is on."""
+        username = self.config['API']['username']
+        session = self.config.get('API', 'sessions', fallback='') or self.config['API']['session']
+        if self.api_client.restore_token(username):
+            print("Reusing the saved gateway token.")
+            self._on_logged_in(session)
+            return
+        password = self.config.get('API', 'password', fallback='')
+        if not (self.config.getboolean('API', 'auto_login', fallback=True) and username and password):
+            return
+        self.runner.spawn(self.api_client.login, username, password,
+                          on_done=lambda result: self._on_auto_login(result, session),
+                          on_error=lambda e: print(f"Automatic gateway login failed: {e}"))
+
+    def _on_auto_login(self, result, session):
+        if not self.api_client.token:
+            print(f"Automatic gateway login failed: {result}")
+            return
+        print("Logged in to the gateway.")
+        self._on_logged_in(session)
+        if self.awaiting_validation:
+            self.load_and_validate_next_customer()
+
+    def _on_logged_in(self, session):
+        self.api_session_name = session
+        # Several comma-separated names share the checks between those sessions.
+        self.session_pool = SessionPool.from_text(
+            session, strategy=self.config.get('API', 'session_strategy', fallback='round_robin'),
+            cooldown=self.config.getfloat('API', 'session_cooldown', fallback=60))
+        # Queued behind the sheet setup, so the prefetcher exists by the time this runs.
+        self.runner.submit(lambda: self.prefetcher.reset(self.session_pool))
+
+    def _on_sheet_ready(self, _):
+        self.root.after(5000, self.check_write_failures)
+        if self.leases:
+            self.root.after(int(self.leases.ttl * 1000 / 3), self.renew_leases)
+        self.load_first_customer()
+
+    def _on_init_error(self, error):
+        messagebox.showerror("Error", f"Could not initialize app.\nError: {error}")
+        self.on_closing()
 
     def setup_global_macros(self):
         try:
             if self.config.has_section('MACROS'):
+                import keyboard
+                self.keyboard = keyboard
                 key1 = self.config.get('MACROS', 'copy_message_1_key', fallback=None)
                 if key1:
-                    keyboard.add_hotkey(key1.lower(), self.copy_message_1)
+                    self.keyboard.add_hotkey(key1.lower(), self.copy_message_1)
                     print(f"Global hotkey '{key1}' bound to Copy Message 1.")
 
                 key2 = self.config.get('MACROS', 'copy_message_2_key', fallback=None)
                 if key2:
-                    keyboard.add_hotkey(key2.lower(), self.copy_message_2)
+                    self.keyboard.add_hotkey(key2.lower(), self.copy_message_2)
                     print(f"Global hotkey '{key2}' bound to Copy Message 2.")
         except Exception as e:
             messagebox.showerror("Macro Error",
@@ -65,7 +165,25 @@ class WhatsAppHelperApp:
 
     def on_closing(self):
         print("Closing application and removing hotkeys...")
-        keyboard.remove_all_hotkeys()
+        if self.keyboard:
+            self.keyboard.remove_all_hotkeys()
+        self.runner.shutdown()
+        if self.prefetcher:
+            self.prefetcher.shutdown()
+        if self.status_writer:
+            print("Flushing pending status updates...")
+            failures = self.status_writer.close()
+            if failures:
+                self.report_write_failures(failures)
+        if self.write_journal:
+            self.write_journal.close()
+        if self.leases:
+            self.leases.close()
+        if self.validation_cache:
+            self.validation_cache.close()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        self.session_log.close()
         self.root.destroy()
 
     def setup_gui(self):
@@ -74,10 +192,16 @@ class WhatsAppHelperApp:
         api_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="API", menu=api_menu)
         api_menu.add_command(label="Login to Gateway...", command=self.open_login_window)
+        api_menu.add_separator()
+        api_menu.add_command(label="Validation Cache Stats", command=self.show_cache_stats)
+        api_menu.add_command(label="Purge Validation Cache", command=self.purge_validation_cache)
         log_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Logs", menu=log_menu)
         log_menu.add_command(label="View Success Log", command=lambda: self.show_log_window("Success"))
         log_menu.add_command(label="View Failed Log", command=lambda: self.show_log_window("Failed"))
+        stats_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Stats", menu=stats_menu)
+        stats_menu.add_command(label="View Timing Stats", command=self.show_stats_window)
 
         main_frame = tk.Frame(self.root, padx=10, pady=10)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -132,25 +256,73 @@ class WhatsAppHelperApp:
         self.invalid_button = tk.Button(action_frame, text="Mark as Invalid & Get Next", command=self.mark_invalid_and_next, bg="#f44336", fg="white", font=("Helvetica", 10, "bold"), state=tk.DISABLED)
         self.invalid_button.pack(fill=tk.X, pady=(5,0))
 
+        status_frame = tk.Frame(self.root, bd=1, relief=tk.SUNKEN)
+        status_frame.pack(fill=tk.X, side=tk.BOTTOM, before=main_frame)
+        self.status_bar_label = tk.Label(status_frame, text="Ready", anchor="w")
+        self.status_bar_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.cancel_button = tk.Button(status_frame, text="Cancel", command=self.cancel_search, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT, padx=5, pady=2)
+
+    def set_busy(self, message, cancellable=False):
+        self.status_bar_label.config(text=message)
+        self.next_button.config(state=tk.DISABLED); self.invalid_button.config(state=tk.DISABLED)
+        self.previous_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL if cancellable else tk.DISABLED)
+
+    def set_idle(self, message="Ready"):
+        self.status_bar_label.config(text=message)
+        self.cancel_button.config(state=tk.DISABLED)
+
     def authenticate_and_load_sheet(self):
-        gc = gspread.service_account(filename="credentials.json")
-        sheet_name = self.config['DEFAULT']['google_sheet_name']
-        worksheet_name = self.config['DEFAULT']['worksheet_name']
-        self.worksheet = gc.open(sheet_name).worksheet(worksheet_name)
+        self.worksheet = open_worksheet(self.config)
         print("Successfully connected to Google Sheets.")
-
-    def get_time_based_greeting(self):
-        h = datetime.now().hour
-        if 4 <= h < 10: return "pagi"
-        elif 10 <= h < 15: return "siang"
-        elif 15 <= h < 18: return "sore"
-        else: return "malam"
+        self.row_cache = SheetRowCache(
+            self.worksheet, self.config['COLUMNS'],
+            [self.config['DEFAULT']['status_done_text'], self.config['DEFAULT']['status_invalid_text'],
+             self.config.get('DEFAULT', 'status_duplicate_text', fallback='DUPLICATE')],
+            window_size=self.config.getint('SHEET', 'window_size', fallback=2000),
+            refresh_interval=self.config.getfloat('SHEET', 'refresh_interval', fallback=60),
+            country_code=self.config['API']['country_code'])
+        self.row_cache.load()
+        sheet_key = f"{self.config['DEFAULT']['google_sheet_name']}/{self.config['DEFAULT']['worksheet_name']}"
+        if self.config.getboolean('LEASES', 'enabled', fallback=False):
+            if self.config.get('LEASES', 'backend', fallback='sqlite') == 'sheet':
+                backend = SheetLeaseBackend(self.worksheet, self.config.get('LEASES', 'claim_column', fallback='CLAIMED BY'))
+            else:
+                backend = SQLiteLeaseBackend(self.config.get('LEASES', 'path', fallback='leases.sqlite3'), sheet_key)
+            self.leases = LeaseManager(
+                backend, self.config.get('LEASES', 'operator', fallback='') or default_operator_id(),
+                block_size=self.config.getint('LEASES', 'block_size', fallback=50),
+                ttl=self.config.getfloat('LEASES', 'ttl_minutes', fallback=15) * 60)
+            self.row_cache = LeasedRowCache(self.row_cache, self.leases)
+            print(f"Row leasing enabled as operator '{self.leases.operator}'.")
+        journal_path = self.config.get('JOURNAL', 'path', fallback='journal.sqlite3')
+        if journal_path:
+            self.write_journal = WriteJournal(journal_path, sheet_key)
+        self.status_writer = StatusWriter(
+            self.worksheet, self.row_cache.status_col,
+            flush_interval=self.config.getfloat('SHEET', 'write_interval', fallback=2.0),
+            journal=self.write_journal)
+        if self.write_journal:
+            unflushed = self.write_journal.unflushed()
+            if unflushed:
+                print(f"Replaying {len(unflushed)} status update(s) not saved in the last session.")
+            for row, status_text in unflushed:
+                self.status_writer.enqueue(row, status_text)
+                self.row_cache.mark(row, status_text)
+        self.prefetcher = PrefetchValidator(
+            self.row_cache, self.api_client, self.config['API']['country_code'],
+            lookahead=self.config.getint('PREFETCH', 'lookahead', fallback=10),
+            max_workers=self.config.getint('PREFETCH', 'workers', fallback=4),
+            skip_duplicates=self.config.getboolean('PREFETCH', 'skip_duplicates', fallback=False))
+
+    def get_time_based_greeting(self, at=None):
+        return get_time_based_greeting(at)
 
     def refresh_greeting(self, event=None):
-        if not self.current_customer_data: return
-        name = self.current_customer_data.get(self.config['COLUMNS']['name'], "")
-        greeting_word = self.get_time_based_greeting()
-        msg1 = f"Selamat {greeting_word} ka {name}"
+        if not self.current_customer: return
+        msg1 = self.templates.render(self.current_customer, self.get_time_based_greeting())[1]
+        self.message_texts[1] = msg1
         self.update_text_widget(self.msg1_text, msg1)
         print("Greeting refreshed.")
 
@@ -158,101 +330,156 @@ class WhatsAppHelperApp:
         if not self.api_client.token:
             messagebox.showwarning("Not Logged In", "Please login via the API menu to start processing.")
             return
+        if self.runner.is_busy("next"): return
 
         self.name_val_label.config(text="Searching...")
         self.phone_val_label.config(text="-")
         self.username_val_label.config(text="-")
-        self.next_button.config(state=tk.DISABLED); self.invalid_button.config(state=tk.DISABLED)
-        self.root.update_idletasks()
-
-        all_records = self.worksheet.get_all_records()
-        start_index = self.current_customer_data.get('row_index', 1) - 1
-
-        while True:
-            if self.current_customer_data:
-                self.previous_customer_data = self.current_customer_data.copy()
-
-            found_customer = None
-            for i in range(start_index, len(all_records)):
-                record = all_records[i]
-                status = str(record.get(self.config['COLUMNS']['status'], '')).strip()
-                if status not in [self.config['DEFAULT']['status_done_text'], self.config['DEFAULT']['status_invalid_text']]:
-                    found_customer = record
-                    found_customer['row_index'] = i + 2
-                    start_index = i + 1
-                    break
-
-            if not found_customer:
-                self._display_no_more_customers(); return
-
-            self.current_customer_data = found_customer
-            phone_to_check = self.current_customer_data.get(self.config['COLUMNS']['phone'], "")
-
-            is_valid, err_msg, is_auth_err = self.api_client.is_phone_registered(self.api_session_name, phone_to_check, self.config['API']['country_code'])
-
-            if is_auth_err:
-                self.handle_auth_failure(err_msg); return
-
-            if is_valid is None and not is_auth_err:
-                messagebox.showerror("API Connection Error", f"Could not check phone number: {err_msg}\n\nThe process will stop.")
-                self.name_val_label.config(text="API Error")
-                self.phone_status_label.config(text="Re-login")
-                self.clear_customer_info()
-                return
-
-            if is_valid:
-                self.phone_status_label.config(text="Registered", fg="green")
-                self._display_customer_data()
-                return
-            else:
-                print(f"Number {phone_to_check} is invalid, auto-skipping.")
-                self._update_status(self.config['DEFAULT']['status_invalid_text'])
+        self.phone_status_label.config(text="")
+        self.set_busy("Searching for the next customer...", cancellable=True)
+
+        after_row = self.current_customer.row_index if self.current_customer else 1
+        if self.current_customer and self.awaiting_validation:
+            # The customer on screen was shown before login and hasn't been checked yet.
+            after_row -= 1
+        self.runner.submit(self._find_next_customer, after_row, on_done=self._on_next_customer,
+                           on_error=self._on_next_customer_error, on_cancel=self._on_next_customer_cancelled,
+                           tag="next", with_cancel=True)
+
+    def _find_next_customer(self, after_row, cancel_event=None):
+        """Runs on the worker thread: auto-skips invalid numbers until a registered customer is found.
+
+        Also returns how many customers after it are already confirmed, read here because
+        the pipeline is only safe to inspect from the worker.
+        """
+        found = self.prefetcher.next_registered(after_row, self._skip_invalid_customer, cancel_event,
+                                                on_duplicate=self._skip_duplicate_customer)
+        return found + (self.prefetcher.ready_count(),)
+
+    def _skip_invalid_customer(self, record):
+        print(f"Number {record.phone} is invalid, auto-skipping.")
+        self._queue_status(record, self.config['DEFAULT']['status_invalid_text'])
+        self.runner.post(self._log_status, record, self.config['DEFAULT']['status_invalid_text'])
+
+    def _skip_duplicate_customer(self, record):
+        first_row = self.row_cache.duplicate_rows(record)[0]
+        print(f"Number {record.phone} already appears on row {first_row}, skipping.")
+        self._queue_status(record, self.config.get('DEFAULT', 'status_duplicate_text', fallback='DUPLICATE'))
+
+    def _on_next_customer(self, found):
+        record, result, skipped, ready = found
+        self.set_idle(f"Ready ({ready} more customer(s) pre-validated)")
+        if skipped:
+            self.current_customer = skipped
+            self.awaiting_validation = False
+
+        if not record:
+            self.awaiting_validation = False
+            if self.current_customer:
+                self.previous_customer = self.current_customer
+            self._display_no_more_customers(); return
+
+        is_valid, err_msg, is_auth_err = result
+
+        if is_auth_err:
+            self.handle_auth_failure(err_msg); return
+
+        if is_valid is None:
+            messagebox.showerror("API Connection Error", f"Could not check phone number: {err_msg}\n\nThe process will stop.")
+            self.name_val_label.config(text="API Error")
+            self.phone_status_label.config(text="Re-login")
+            self.clear_customer_info()
+            return
+
+        if self.current_customer and not self.awaiting_validation:
+            self.previous_customer = self.current_customer
+        self.current_customer = record
+        self.awaiting_validation = False
+        self.phone_status_label.config(text="Registered", fg="green")
+        self._display_customer_data()
+
+    def _on_next_customer_error(self, error):
+        self.set_idle()
+        messagebox.showerror("Error", f"Could not load the next customer.\nError: {error}")
+        self.name_val_label.config(text="Sheet Error")
+        self.clear_customer_info()
+
+    def _on_next_customer_cancelled(self):
+        self.set_idle("Search cancelled.")
+        if self.current_customer:
+            self._display_customer_data(enable_buttons=not self.awaiting_validation)
+        else:
+            self.clear_customer_info()
+
+    def cancel_search(self):
+        self.runner.cancel("next")
+        self.status_bar_label.config(text="Cancelling...")
 
     def load_previous_customer(self):
-        if not self.previous_customer_data:
+        if self.runner.is_busy("next"): return
+        if not self.previous_customer:
             messagebox.showinfo("Info", "No previous customer in history.")
             return
 
         print("Loading previous customer...")
-        self.current_customer_data = self.previous_customer_data
-        self.previous_customer_data = {}
+        self.current_customer = self.previous_customer
+        self.previous_customer = None
 
         self._display_customer_data()
         self.phone_status_label.config(text="Registered", fg="green")
 
     def load_first_customer(self):
-        self.previous_customer_data = {}
-        all_records = self.worksheet.get_all_records()
-        for i, record in enumerate(all_records):
-            status = str(record.get(self.config['COLUMNS']['status'], '')).strip()
-            if status not in [self.config['DEFAULT']['status_done_text'], self.config['DEFAULT']['status_invalid_text']]:
-                self.current_customer_data = record
-                self.current_customer_data['row_index'] = i + 2
-                self._display_customer_data(enable_buttons=False)
+        self.previous_customer = None
+        self.set_busy("Loading customers...")
+        resume_row = None
+        if self.write_journal and self.config.getboolean('JOURNAL', 'resume', fallback=True):
+            resume_row = self.write_journal.cursor()
+        self.runner.submit(self._find_first_customer, resume_row, on_done=self._show_first_customer,
+                           on_error=self._on_init_error, tag="sheet")
+
+    def _find_first_customer(self, resume_row):
+        """Runs on the worker thread: starts at the last customer shown, falling back to the top."""
+        if resume_row:
+            record = self.row_cache.next_pending(resume_row - 1)
+            if record:
+                print(f"Resuming at row {record.row_index}.")
+                return record
+        return self.row_cache.next_pending()
+
+    def _show_first_customer(self, record):
+        self.set_idle()
+        if record and not self.current_customer:
+            self.current_customer = record
+            self.awaiting_validation = True
+            self._display_customer_data(enable_buttons=False)
+            if self.session_pool and self.api_client.token:
+                self.load_and_validate_next_customer()
+            else:
                 self.phone_status_label.config(text="Login to check", fg="blue")
-                break
 
     def _display_customer_data(self, enable_buttons=True):
-        name = self.current_customer_data.get(self.config['COLUMNS']['name'], "")
-        phone = self.current_customer_data.get(self.config['COLUMNS']['phone'], "")
-        user_id = self.current_customer_data.get(self.config['COLUMNS']['id'], "")
-        last_login = self.current_customer_data.get(self.config['COLUMNS']['last_login'], "")
+        customer = self.current_customer
+        name, phone, user_id = customer.name, customer.phone, customer.user_id
+        if self.write_journal:
+            self.write_journal.save_cursor(customer.row_index)
+        if not self.first_customer_shown:
+            self.first_customer_shown = True
+            elapsed = time.perf_counter() - self.started_at
+            metrics.record("app.time_to_first_customer", elapsed)
+            self.status_bar_label.config(text=f"First customer ready in {elapsed:.1f}s")
+            print(f"Time to first customer: {elapsed:.2f}s")
 
         self.name_val_label.config(text=name)
         self.phone_val_label.config(text=phone)
         self.username_val_label.config(text=user_id)
 
-        greeting_word = self.get_time_based_greeting()
-        msg1 = f"Selamat {greeting_word} ka {name}"
-        msg2 = (f"ingin konfirmasi mengenai ID kaka *{user_id}* \n"
-                 f"sejak *{last_login}*\nDi situs Amor77\n"
-                 f"belum dimainkan ya ka ? apakah ada kendala ?")
-        self.update_text_widget(self.msg1_text, msg1); self.update_text_widget(self.msg2_text, msg2)
+        self.message_texts = self.templates.render(customer, self.get_time_based_greeting())
+        self.update_text_widget(self.msg1_text, self.message_texts[1]); self.update_text_widget(self.msg2_text, self.message_texts[2])
 
         if enable_buttons and self.api_client.token:
             self.next_button.config(state=tk.NORMAL); self.invalid_button.config(state=tk.NORMAL)
 
-        if self.previous_customer_data:
+        if self.previous_customer:
             self.previous_button.config(state=tk.NORMAL)
         else:
             self.previous_button.config(state=tk.DISABLED)
@@ -262,6 +489,7 @@ class WhatsAppHelperApp:
         self.name_val_label.config(text="-")
         self.phone_val_label.config(text="-")
         self.username_val_label.config(text="-")
+        self.message_texts = {1: "", 2: ""}
         self.update_text_widget(self.msg1_text, "")
         self.update_text_widget(self.msg2_text, "")
 
@@ -274,21 +502,44 @@ class WhatsAppHelperApp:
         self.previous_button.config(state=tk.DISABLED)
 
     def _update_status(self, status_text):
-        if not self.current_customer_data: return
-        try:
-            status_col_name = self.config['COLUMNS']['status']
-            row, col = self.current_customer_data['row_index'], self.worksheet.find(status_col_name).col
-            self.worksheet.update_cell(row, col, status_text)
-            print(f"Updated row {row} status to '{status_text}'.")
-            name = self.current_customer_data.get(self.config['COLUMNS']['name'], 'N/A')
-            phone = self.current_customer_data.get(self.config['COLUMNS']['phone'], 'N/A')
-            username = self.current_customer_data.get(self.config['COLUMNS']['id'], 'N/A')
-            log_entry = f"{name} ({phone}) - {username}"
-            if status_text == self.config['DEFAULT']['status_done_text']: self.success_log.append(log_entry)
-            elif status_text == self.config['DEFAULT']['status_invalid_text']: self.failed_log.append(log_entry)
-            self.update_log_window("Success" if status_text == self.config['DEFAULT']['status_done_text'] else "Failed")
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not update Google Sheet.\nError: {e}")
+        if not self.current_customer: return
+        self._queue_status(self.current_customer, status_text)
+        self._log_status(self.current_customer, status_text)
+
+    def _queue_status(self, record, status_text):
+        """Hands the write to the status writer; safe to call from the worker thread."""
+        row = record.row_index
+        self.status_writer.enqueue(row, status_text)
+        self.row_cache.mark(row, status_text)
+        print(f"Queued row {row} status '{status_text}'.")
+
+    def _log_status(self, record, status_text):
+        name = record.name or 'N/A'
+        phone = record.phone or 'N/A'
+        username = record.user_id or 'N/A'
+        log_type, entry = self.session_log.append(record.row_index, status_text, name, phone, username)
+        if log_type: self.append_to_log_window(log_type, entry)
+
+    def renew_leases(self):
+        current_row = self.current_customer.row_index if self.current_customer else None
+        self.runner.submit(self.leases.renew, current_row, on_error=lambda e: print(f"Could not renew row leases: {e}"),
+                           tag="leases")
+        self.root.after(int(self.leases.ttl * 1000 / 3), self.renew_leases)
+
+    def check_write_failures(self):
+        if not self.status_writer: return
+        failures = self.status_writer.take_failures()
+        if failures:
+            self.report_write_failures(failures)
+        self.root.after(5000, self.check_write_failures)
+
+    def report_write_failures(self, failures):
+        lines = [f"Row {row}: '{status}' ({error})" for row, status, error in failures[:20]]
+        if len(failures) > 20: lines.append(f"...and {len(failures) - 20} more.")
+        print("Could not write status updates:\n" + "\n".join(lines))
+        retry_note = "\n\nThey are kept in the journal and will be written on the next start." if self.write_journal else ""
+        messagebox.showerror("Sheet Write Error",
+            f"{len(failures)} status update(s) could not be saved to Google Sheet:\n\n" + "\n".join(lines) + retry_note)
 
     def mark_done_and_next(self):
         self._update_status(self.config['DEFAULT']['status_done_text']); self.load_and_validate_next_customer()
@@ -301,22 +552,49 @@ class WhatsAppHelperApp:
         login_window.transient(self.root); login_window.grab_set()
         Label(login_window, text="Username:").pack(pady=(10,0)); user_entry = Entry(login_window, width=30); user_entry.pack(); user_entry.insert(0, self.config['API']['username'])
         Label(login_window, text="Password:").pack(pady=(5,0)); pass_entry = Entry(login_window, show="*", width=30); pass_entry.pack(); pass_entry.insert(0, self.config['API']['password'])
-        Label(login_window, text="Session Name:").pack(pady=(5,0)); session_entry = Entry(login_window, width=30); session_entry.pack(); session_entry.insert(0, self.api_session_name or self.config['API']['session'])
+        Label(login_window, text="Session Name:").pack(pady=(5,0)); session_entry = Entry(login_window, width=30); session_entry.pack(); session_entry.insert(0, self.api_session_name or self.config.get('API', 'sessions', fallback='') or self.config['API']['session'])
 
         def perform_login():
             user, pwd, session = user_entry.get(), pass_entry.get(), session_entry.get()
             if not all([user, pwd, session]): messagebox.showerror("Error", "All fields are required.", parent=login_window); return
 
-            result = self.api_client.login(user, pwd)
+            login_button.config(state=tk.DISABLED, text="Logging in...")
+            self.runner.submit(self.api_client.login, user, pwd, tag="login",
+                               on_done=lambda result: on_login_result(result, session),
+                               on_error=lambda e: on_login_result(str(e), session))
+
+        def on_login_result(result, session):
+            if not login_window.winfo_exists(): return
             if self.api_client.token:
-                self.api_session_name = session
+                self._on_logged_in(session)
                 messagebox.showinfo("Success", "Successfully logged in. You may now begin.", parent=login_window)
                 login_window.destroy()
                 self.load_and_validate_next_customer()
             else:
+                login_button.config(state=tk.NORMAL, text="Login")
                 messagebox.showerror("Login Failed", f"Could not log in.\nServer says: {result}", parent=login_window)
 
-        Button(login_window, text="Login", command=perform_login).pack(pady=15)
+        login_button = Button(login_window, text="Login", command=perform_login)
+        login_button.pack(pady=15)
+
+    def show_cache_stats(self):
+        if not self.validation_cache:
+            messagebox.showinfo("Validation Cache", "The validation cache is disabled in config.ini."); return
+        stats = self.validation_cache.stats()
+        messagebox.showinfo("Validation Cache",
+            f"Cached numbers: {stats['entries']}\n"
+            f"Hits this session: {stats['hits']}\n"
+            f"Misses this session: {stats['misses']}\n"
+            f"Hit rate: {stats['hit_rate']:.1f}%")
+
+    def purge_validation_cache(self):
+        if not self.validation_cache:
+            messagebox.showinfo("Validation Cache", "The validation cache is disabled in config.ini."); return
+        if not messagebox.askyesno("Purge Validation Cache", "Delete all cached phone validation results?"): return
+        removed = self.validation_cache.purge()
+        if self.prefetcher: self.runner.submit(self.prefetcher.reset, None, True)
+        print(f"Purged {removed} cached validation result(s).")
+        messagebox.showinfo("Validation Cache", f"Removed {removed} cached result(s).")
 
     def handle_auth_failure(self, error_message):
         self.api_client.token = None
@@ -334,60 +612,99 @@ class WhatsAppHelperApp:
         pyperclip.copy(username)
         print(f"Username '{username}' copied to clipboard.")
 
+    # The copy_message_* handlers also run on the keyboard hook thread, so they read
+    # the rendered text from message_texts instead of querying Tk widgets.
     def copy_message_1(self, event=None):
-        pyperclip.copy(self.msg1_text.get("1.0", tk.END).strip())
+        pyperclip.copy(self.message_texts[1].strip())
         print("Message 1 copied to clipboard.")
 
     def copy_message_2(self, event=None):
-        pyperclip.copy(self.msg2_text.get("1.0", tk.END).strip())
+        pyperclip.copy(self.message_texts[2].strip())
         print("Message 2 copied to clipboard.")
 
     def show_log_window(self, log_type):
         if self.log_windows.get(log_type) and self.log_windows[log_type].winfo_exists(): self.log_windows[log_type].lift(); return
         log_window = Toplevel(self.root); log_window.title(f"{log_type} Log"); log_window.geometry("500x500")
         button_frame = tk.Frame(log_window); button_frame.pack(pady=5, fill=tk.X, padx=5)
-        tk.Button(button_frame, text="Copy Selected Username", command=lambda: self.copy_selected_log_username(listbox)).pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0,2))
-        tk.Button(button_frame, text="Copy ALL Usernames", command=lambda: self.copy_all_log_usernames(listbox)).pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(2,0))
+        tk.Button(button_frame, text="Copy Selected Username", command=lambda: self.copy_selected_log_username(log_type, listbox)).pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0,2))
+        tk.Button(button_frame, text="Copy ALL Usernames", command=lambda: self.copy_all_log_usernames(log_type)).pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(2,0))
         listbox_frame = tk.Frame(log_window); listbox_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0,5))
         listbox = Listbox(listbox_frame, font=("Courier", 10)); listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar = Scrollbar(listbox_frame, orient="vertical"); scrollbar.config(command=listbox.yview); scrollbar.pack(side=tk.RIGHT, fill="y")
         listbox.config(yscrollcommand=scrollbar.set)
-        self.log_windows[log_type] = log_window
-        self.update_log_window(log_type)
+        self.log_windows[log_type], self.log_listboxes[log_type] = log_window, listbox
+        for entry in self.session_log.entries[log_type][-self.max_visible_log_items:]:
+            listbox.insert(tk.END, entry.display())
+        listbox.see(tk.END)
+
+    def show_stats_window(self):
+        if self.stats_window and self.stats_window.winfo_exists(): self.stats_window.lift(); return
+        self.stats_window = Toplevel(self.root); self.stats_window.title("Timing Stats"); self.stats_window.geometry("720x360")
+        listbox = Listbox(self.stats_window, font=("Courier", 10)); listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.refresh_stats_window(listbox)
+
+    def refresh_stats_window(self, listbox):
+        if not self.stats_window or not self.stats_window.winfo_exists(): return
+        snapshot = metrics.snapshot()
+        lines = [f"{'Operation':<28}{'Calls':>7}{'Errors':>8}{'Avg ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'Max ms':>10}"]
+        for name, op in snapshot['operations'].items():
+            lines.append(f"{name:<28}{op['count']:>7}{op['errors']:>8}{op['avg_ms']:>10.1f}"
+                         f"{op['p50_ms']:>10.1f}{op['p95_ms']:>10.1f}{op['max_ms']:>10.1f}")
+        lines.append("")
+        for name, value in snapshot['counters'].items():
+            lines.append(f"{name:<28}{value:>7}")
+        if self.status_writer:
+            lines.append(f"{'sheets.pending_writes':<28}{self.status_writer.pending_count():>7}")
+        if self.session_pool:
+            lines.append("")
+            lines.append(f"{'Session':<28}{'Checks':>7}{'Errors':>8}{'Error %':>10}{'Per min':>10}{'Active':>10}{'Rest s':>10}")
+            for s in self.session_pool.stats():
+                lines.append(f"{s['session']:<28}{s['checks']:>7}{s['errors']:>8}{s['error_rate']:>10.1f}"
+                             f"{s['per_minute']:>10.1f}{s['in_flight']:>10}{s['cooldown_s']:>10.0f}")
+        listbox.delete(0, tk.END)
+        for line in lines: listbox.insert(tk.END, line)
+        self.root.after(1000, self.refresh_stats_window, listbox)
 
-    def copy_selected_log_username(self, listbox):
+    def copy_selected_log_username(self, log_type, listbox):
         indices = listbox.curselection()
         if not indices: messagebox.showwarning("No Selection", "Please click on an item in the log to select it first."); return
-        entry = listbox.get(indices[0])
-        try: username = entry.split(' - ')[-1].strip(); pyperclip.copy(username); print(f"Copied: {username}")
-        except IndexError: print(f"Could not parse: {entry}")
-
-    def copy_all_log_usernames(self, listbox):
-        entries = listbox.get(0, tk.END)
-        if not entries: messagebox.showwarning("Empty Log", "The log is empty."); return
-        usernames = [e.split(' - ')[-1].strip() for e in entries if ' - ' in e]
+        # The listbox only shows the newest entries, so map its index back into the full log.
+        entries = self.session_log.entries[log_type]
+        entry = entries[len(entries) - listbox.size() + indices[0]]
+        pyperclip.copy(entry.username); print(f"Copied: {entry.username}")
+
+    def copy_all_log_usernames(self, log_type):
+        if not self.session_log.entries[log_type]: messagebox.showwarning("Empty Log", "The log is empty."); return
+        usernames = self.session_log.usernames(log_type)
         if usernames: pyperclip.copy("\n".join(usernames)); messagebox.showinfo("Copied!", f"{len(usernames)} usernames copied.")
         else: messagebox.showwarning("No Usernames", "Could not find any usernames to copy.")
 
-    def update_log_window(self, log_type):
+    def append_to_log_window(self, log_type, entry):
         if not self.log_windows.get(log_type) or not self.log_windows[log_type].winfo_exists(): return
-        window = self.log_windows[log_type]
-        listbox = window.winfo_children()[1].winfo_children()[0]
-        log_data = self.success_log if log_type == "Success" else self.failed_log
-        listbox.delete(0, tk.END)
-        for item in log_data: listbox.insert(tk.END, item)
+        listbox = self.log_listboxes[log_type]
+        listbox.insert(tk.END, entry.display())
+        overflow = listbox.size() - self.max_visible_log_items
+        if overflow > 0: listbox.delete(0, overflow - 1)
+        listbox.see(tk.END)
 
     def update_text_widget(self, widget, text):
         widget.config(state=tk.NORMAL); widget.delete("1.0", tk.END); widget.insert("1.0", str(text)); widget.config(state=tk.DISABLED)
 
 if __name__ == "__main__":
-    try:
-        import gspread, pyperclip, requests, configparser, keyboard
-    except ImportError as e:
-        module = str(e).split("'")[-2]
-        print(f"Required library '{module}' not found.")
-        print(f"Please install it by running: pip install {module}")
-        sys.exit()
+    # find_spec only locates the modules; they are imported once, where they are first used.
+    required = ["gspread", "pyperclip", "requests"]
+    if not {"--validate-all", "--export-messages"} & set(sys.argv[1:]): required.append("keyboard")
+    for module in required:
+        if importlib.util.find_spec(module) is None:
+            print(f"Required library '{module}' not found.")
+            print(f"Please install it by running: pip install {module}")
+            sys.exit()
+    if "--validate-all" in sys.argv[1:]:
+        import bulk_validate
+        sys.exit(bulk_validate.main([a for a in sys.argv[1:] if a != "--validate-all"]))
+    if "--export-messages" in sys.argv[1:]:
+        import export_messages
+        sys.exit(export_messages.main([a for a in sys.argv[1:] if a != "--export-messages"]))
     root = tk.Tk()
     app = WhatsAppHelperApp(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,157 @@
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+class OperationStats:
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, elapsed_ms, error):
+        self.count += 1
+        self.errors += int(bool(error))
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for i, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the ``pct``th percentile (capped at the max seen)."""
+        if not self.count: return 0.0
+        target, seen = self.count * pct / 100, 0
+        for bound, n in zip(BUCKETS_MS, self.buckets):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class Metrics:
+    """Thread-safe per-operation call counters and latency histograms."""
+
+    def __init__(self):
+        self._ops = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, operation, elapsed_seconds, error=False):
+        with self._lock:
+            stats = self._ops.get(operation)
+            if stats is None:
+                stats = self._ops[operation] = OperationStats()
+            stats.add(elapsed_seconds * 1000, error)
+
+    @contextmanager
+    def timed(self, operation):
+        """Times the block; an exception counts as an error and is re-raised."""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(operation, time.perf_counter() - start, error)
+
+    def increment(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            operations = {
+                name: {
+                    "count": s.count,
+                    "errors": s.errors,
+                    "avg_ms": round(s.total_ms / s.count, 2) if s.count else 0.0,
+                    "p50_ms": round(s.percentile(50), 2),
+                    "p95_ms": round(s.percentile(95), 2),
+                    "max_ms": round(s.max_ms, 2),
+                    "buckets": {("inf" if b == float("inf") else str(b)): n for b, n in zip(BUCKETS_MS, s.buckets)},
+                }
+                for name, s in sorted(self._ops.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+        return {"timestamp": time.time(), "uptime_s": round(time.time() - self.started_at, 1),
+                "operations": operations, "counters": counters}
+
+    def export(self, path):
+        """Writes a snapshot to ``path`` as JSON, or as CSV if the name ends in .csv."""
+        snapshot = self.snapshot()
+        tmp_path = f"{path}.tmp"
+        if path.lower().endswith(".csv"):
+            with open(tmp_path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["timestamp", "operation", "count", "errors", "avg_ms", "p50_ms", "p95_ms", "max_ms"])
+                for name, s in snapshot["operations"].items():
+                    writer.writerow([int(snapshot["timestamp"]), name, s["count"], s["errors"],
+                                     s["avg_ms"], s["p50_ms"], s["p95_ms"], s["max_ms"]])
+                for name, value in snapshot["counters"].items():
+                    writer.writerow([int(snapshot["timestamp"]), name, value, "", "", "", "", ""])
+        else:
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+class MetricsExporter:
+    """Writes ``metrics`` to ``path`` every ``interval`` seconds from a daemon thread."""
+
+    def __init__(self, metrics, path, interval=60):
+        self.metrics = metrics
+        self.path = path
+        self.interval = float(interval)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="MetricsExporter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def export(self):
+        try:
+            self.metrics.export(self.path)
+        except OSError as e:
+            print(f"Could not export metrics to {self.path}: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self.export()
+
+
+class InstrumentedWorksheet:
+    """Wraps a gspread Worksheet so every method call is timed under its own name."""
+
+    def __init__(self, worksheet, metrics):
+        self._worksheet = worksheet
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._worksheet, name)
+        if not callable(attr):
+            return attr
+
+        def timed_call(*args, **kwargs):
+            with self._metrics.timed(f"sheets.{name}"):
+                return attr(*args, **kwargs)
+        return timed_call
+
+
+metrics = Metrics()
@@ -0,0 +1,32 @@
+import re
+
+
+def normalize_phone(phone_number, country_code):
+    """Converts a phone number as typed in the sheet to E.164, e.g. '0812-345' -> '+62812345'.
+
+    Handles '+62 812...', '0062812...', '62812...', '0812...' and '812...' forms.
+    Returns None if the value has no digits.
+    """
+    raw = str(phone_number).strip()
+    digits = re.sub(r"\D", "", raw)
+    if not digits:
+        return None
+    country_code = re.sub(r"\D", "", str(country_code))
+
+    if raw.startswith("+"):
+        return "+" + digits
+    if digits.startswith("00"):
+        return "+" + digits[2:]
+    if digits.startswith(country_code) and len(digits) > len(country_code) + 6:
+        return "+" + digits
+    if digits.startswith("0"):
+        digits = digits[1:]
+    return "+" + country_code + digits
+
+
+def gateway_number(phone_e164):
+    """Formats an E.164 number for the gateway's is-registered URL: the full international digits.
+
+    The country code is already part of the number, so it is never applied a second time.
+    """
+    return phone_e164.lstrip("+")
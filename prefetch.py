@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class PrefetchValidator:
+    """Validates the next ``lookahead`` pending customers ahead of the operator.
+
+    Phone checks run concurrently on a bounded worker pool. ``next_customer`` hands
+    out rows in sheet order together with their (usually already finished) result,
+    so the operator only waits when the pipeline has not caught up yet.
+
+    Each unique normalized number is checked once per session; rows repeating a
+    number share the same check. With ``skip_duplicates`` a row whose number
+    already appears on an earlier row is not checked at all.
+
+    The row cache is only touched from the calling thread; workers just call the API.
+    ``session_name`` may be a SessionPool to spread the checks over several sessions.
+    """
+
+    def __init__(self, row_cache, api_client, country_code, lookahead=10, max_workers=4, skip_duplicates=False):
+        self.row_cache = row_cache
+        self.api_client = api_client
+        self.country_code = country_code
+        self.lookahead = max(1, int(lookahead))
+        self.skip_duplicates = skip_duplicates
+        self.executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="Prefetch")
+
+        self.session_name = None
+        self.in_flight = OrderedDict()
+        self.checks = {}
+        self._last_queued_row = None
+        self._last_handed_row = None
+
+    def _validate(self, phone_e164):
+        if not phone_e164:
+            return False, "No phone number.", False
+        return self.api_client.is_phone_registered(self.session_name, phone_e164, self.country_code)
+
+    def _check_for(self, phone_e164):
+        future = self.checks.get(phone_e164)
+        if future is None or future.cancelled():
+            future = self.checks[phone_e164] = self.executor.submit(self._validate, phone_e164)
+        return future
+
+    def _fill(self, after_row):
+        last_row = self._last_queued_row if self._last_queued_row is not None else after_row
+        while len(self.in_flight) < self.lookahead:
+            record = self.row_cache.next_pending(last_row)
+            if record is None:
+                break
+            last_row = record.row_index
+            if self.skip_duplicates and self.row_cache.is_duplicate(record):
+                future = None
+            else:
+                future = self._check_for(record.phone_e164)
+            self.in_flight[last_row] = (record, future)
+        self._last_queued_row = last_row
+
+    def ready_count(self):
+        """Number of looked-ahead customers already confirmed as registered."""
+        return sum(1 for _, future in self.in_flight.values()
+                   if future is not None and future.done() and not future.cancelled() and future.exception() is None
+                   and future.result()[0])
+
+    def next_customer(self, after_row, cancel_event=None):
+        """Returns ``(record, (is_valid, err_msg, is_auth_err))`` for the next pending row
+        after ``after_row``, or ``(None, None)`` when there are no more customers.
+        The result is None for a row skipped as a duplicate (see ``skip_duplicates``).
+
+        Raises ``CancelledError`` if ``cancel_event`` is set while waiting on a check;
+        the row stays queued for the next call.
+        """
+        if self._last_handed_row is not None and after_row < self._last_handed_row:
+            # Went back to an earlier customer; rows after it must be offered again.
+            self.reset()
+        while self.in_flight and next(iter(self.in_flight)) <= after_row:
+            # Checks may be shared with duplicate rows, so they are left to finish.
+            self.in_flight.popitem(last=False)
+        if self._last_queued_row is not None and self._last_queued_row < after_row:
+            self._last_queued_row = None
+
+        while True:
+            self._fill(after_row)
+            if not self.in_flight:
+                return None, None
+            row, (record, future) = next(iter(self.in_flight.items()))
+            cached = self.row_cache.rows.get(row)
+            if cached is not None and not self.row_cache.is_pending(cached):
+                # Marked by someone else after it was queued.
+                self.in_flight.popitem(last=False)
+                continue
+            result = self._wait(future, cancel_event)
+            self.in_flight.popitem(last=False)
+            self._last_handed_row = row
+            self._fill(row)
+            return record, result
+
+    def next_registered(self, after_row, on_invalid=None, cancel_event=None, on_duplicate=None):
+        """Like ``next_customer`` but skips unregistered numbers, calling ``on_invalid(record)``
+        for each (and ``on_duplicate(record)`` for skipped duplicates).
+        Returns ``(record, result, last_skipped)``; ``record`` is None at the end.
+        Stops early on an error result, which also resets the pipeline.
+        """
+        skipped = None
+        while True:
+            record, result = self.next_customer(after_row, cancel_event)
+            if record is None:
+                return None, None, skipped
+
+            if result is None:
+                if on_duplicate: on_duplicate(record)
+                skipped, after_row = record, record.row_index
+                continue
+
+            is_valid, _, is_auth_err = result
+            if is_valid is None or is_auth_err:
+                self.reset()
+                return record, result, skipped
+            if is_valid:
+                return record, result, skipped
+
+            if on_invalid: on_invalid(record)
+            skipped, after_row = record, record.row_index
+
+    def _wait(self, future, cancel_event):
+        if future is None:
+            return None
+        if cancel_event is None:
+            return future.result()
+        while True:
+            if cancel_event.is_set():
+                raise CancelledError()
+            try:
+                return future.result(timeout=0.1)
+            except FutureTimeout:
+                continue
+
+    def reset(self, session_name=None, clear_results=False):
+        """Drops every queued check, e.g. after a login or a failed request.
+
+        Finished results are kept unless ``clear_results`` is set, e.g. after the
+        validation cache is purged, so every number is checked again.
+        """
+        if session_name is not None:
+            self.session_name = session_name
+        for phone, future in list(self.checks.items()):
+            # Keep finished results; drop anything pending or failed so it is checked again.
+            if not future.done():
+                future.cancel()
+            elif (not clear_results and not future.cancelled() and future.exception() is None
+                  and future.result()[0] is not None):
+                continue
+            del self.checks[phone]
+        self.in_flight.clear()
+        self._last_queued_row = None
+        self._last_handed_row = None
+
+    def shutdown(self):
+        self.reset()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,95 @@
+import glob
+import json
+import os
+import time
+
+LOG_TYPES = ("Success", "Failed")
+
+
+class LogEntry:
+    __slots__ = ("timestamp", "row", "status", "name", "phone", "username")
+
+    def __init__(self, timestamp, row, status, name, phone, username):
+        self.timestamp = timestamp
+        self.row = row
+        self.status = status
+        self.name = name
+        self.phone = phone
+        self.username = username
+
+    def display(self):
+        return f"{self.name} ({self.phone}) - {self.username}"
+
+    def to_json(self):
+        return json.dumps({"ts": self.timestamp, "row": self.row, "status": self.status,
+                           "name": self.name, "phone": self.phone, "username": self.username})
+
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        return cls(data["ts"], data["row"], data["status"], data["name"], data["phone"], data["username"])
+
+
+class SessionLog:
+    """Append-only JSON-lines log of every status change in a session.
+
+    Each entry is written and flushed as it happens, so the log survives a crash,
+    and entries are also kept in memory per log type for the log windows.
+    """
+
+    def __init__(self, path, log_type_for_status):
+        self.path = path
+        self.log_type_for_status = log_type_for_status
+        self.entries = {log_type: [] for log_type in LOG_TYPES}
+        if os.path.exists(path):
+            self._read(path)
+        self._file = open(path, "a", encoding="utf-8")
+        if self._file.tell() and not self._ends_with_newline(path):
+            # Start after a torn last line rather than on the end of it.
+            self._file.write("\n")
+
+    @classmethod
+    def open(cls, directory, log_type_for_status, resume=False):
+        """Opens a new session file in ``directory``, or with ``resume`` the most recent one."""
+        os.makedirs(directory, exist_ok=True)
+        existing = sorted(glob.glob(os.path.join(directory, "session-*.jsonl")))
+        if resume and existing:
+            path = existing[-1]
+        else:
+            path = os.path.join(directory, time.strftime("session-%Y%m%d-%H%M%S.jsonl"))
+        return cls(path, log_type_for_status)
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _read(self, path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip(): continue
+                try:
+                    entry = LogEntry.from_json(line)
+                except (ValueError, KeyError):
+                    # A torn last line from a crash; everything before it is intact.
+                    continue
+                log_type = self.log_type_for_status.get(entry.status)
+                if log_type: self.entries[log_type].append(entry)
+
+    def append(self, row, status, name, phone, username):
+        """Records a status change. Returns ``(log_type, entry)``; ``log_type`` is None for
+        statuses that have no log window.
+        """
+        entry = LogEntry(time.time(), row, status, name, phone, username)
+        self._file.write(entry.to_json() + "\n")
+        self._file.flush()
+        log_type = self.log_type_for_status.get(status)
+        if log_type: self.entries[log_type].append(entry)
+        return log_type, entry
+
+    def usernames(self, log_type):
+        return [e.username for e in self.entries[log_type] if e.username]
+
+    def close(self):
+        self._file.close()
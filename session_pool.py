@@ -0,0 +1,85 @@
+import itertools
+import threading
+import time
+
+STRATEGIES = ("round_robin", "least_loaded")
+
+
+class SessionStats:
+    __slots__ = ("name", "in_flight", "checks", "errors", "cooldown_until")
+
+    def __init__(self, name):
+        self.name = name
+        self.in_flight = 0
+        self.checks = 0
+        self.errors = 0
+        self.cooldown_until = 0.0
+
+
+class SessionPool:
+    """Spreads phone checks across several WhatsApp sessions on the gateway.
+
+    ``acquire`` picks a session in turn (``round_robin``) or the one with the
+    fewest checks in flight (``least_loaded``). A session whose check fails is
+    left out of rotation for ``cooldown`` seconds; if every session is cooling
+    down, the one that recovers first is used anyway rather than stalling.
+    """
+
+    def __init__(self, names, strategy="round_robin", cooldown=60):
+        names = list(dict.fromkeys(n.strip() for n in names if n.strip()))
+        if not names:
+            raise ValueError("At least one session name is required.")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown session strategy '{strategy}', expected one of: {', '.join(STRATEGIES)}")
+        self.sessions = {name: SessionStats(name) for name in names}
+        self.strategy = strategy
+        self.cooldown = float(cooldown)
+        self.started_at = time.monotonic()
+        self._turn = itertools.cycle(names)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_text(cls, text, **kwargs):
+        """Builds a pool from a comma-separated list, e.g. the [API] sessions value."""
+        return cls(text.split(","), **kwargs)
+
+    @property
+    def names(self):
+        return list(self.sessions)
+
+    def acquire(self):
+        """Returns the session to use for the next check; pair it with ``release``."""
+        with self._lock:
+            now = time.monotonic()
+            available = [s for s in self.sessions.values() if s.cooldown_until <= now]
+            if not available:
+                session = min(self.sessions.values(), key=lambda s: s.cooldown_until)
+            elif self.strategy == "least_loaded":
+                session = min(available, key=lambda s: s.in_flight)
+            else:
+                session = None
+                while session not in available:
+                    session = self.sessions[next(self._turn)]
+            session.in_flight += 1
+            return session.name
+
+    def release(self, name, error=False):
+        with self._lock:
+            session = self.sessions[name]
+            session.in_flight -= 1
+            session.checks += 1
+            if error:
+                session.errors += 1
+                session.cooldown_until = time.monotonic() + self.cooldown
+                print(f"Session '{name}' failed a check, resting it for {self.cooldown:.0f}s.")
+
+    def stats(self):
+        """Per-session counts, error rate, checks per minute and remaining cool-down."""
+        with self._lock:
+            now = time.monotonic()
+            minutes = max((now - self.started_at) / 60, 1 / 60)
+            return [{"session": s.name, "checks": s.checks, "errors": s.errors,
+                     "error_rate": (s.errors / s.checks * 100) if s.checks else 0.0,
+                     "per_minute": s.checks / minutes, "in_flight": s.in_flight,
+                     "cooldown_s": max(0.0, s.cooldown_until - now)}
+                    for s in self.sessions.values()]
@@ -0,0 +1,255 @@
+import bisect
+import threading
+import time
+
+from metrics import InstrumentedWorksheet, metrics
+from phone import normalize_phone
+
+COLUMN_KEYS = ('phone', 'name', 'id', 'last_login', 'status')
+
+
+def open_worksheet(config, credentials_file="credentials.json"):
+    """Opens the worksheet named in the [DEFAULT] section with the service account.
+
+    The returned worksheet records the latency of every call in ``metrics``.
+    """
+    import gspread
+    with metrics.timed("sheets.open"):
+        gc = gspread.service_account(filename=credentials_file)
+        worksheet = gc.open(config['DEFAULT']['google_sheet_name']).worksheet(config['DEFAULT']['worksheet_name'])
+    return InstrumentedWorksheet(worksheet, metrics)
+
+
+def column_letter(col):
+    """Converts a 1-based column number to its A1 letter (1 -> A, 28 -> AB)."""
+    letters = ""
+    while col > 0:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+class CustomerRow:
+    """One customer row, holding only the configured [COLUMNS] values."""
+
+    __slots__ = ('row_index', 'phone', 'name', 'user_id', 'last_login', 'status', 'phone_e164')
+
+    def __init__(self, row_index, phone="", name="", user_id="", last_login="", status="", phone_e164=None):
+        self.row_index = row_index
+        self.phone = phone
+        self.name = name
+        self.user_id = user_id
+        self.last_login = last_login
+        self.status = status
+        self.phone_e164 = phone_e164
+
+    def __repr__(self):
+        return f"CustomerRow(row={self.row_index}, phone={self.phone!r}, user_id={self.user_id!r}, status={self.status!r})"
+
+
+# CustomerRow attribute for each [COLUMNS] key.
+COLUMN_FIELDS = {'phone': 'phone', 'name': 'name', 'id': 'user_id', 'last_login': 'last_login', 'status': 'status'}
+
+
+class SheetRowCache:
+    """In-memory cache of the configured customer columns with a forward cursor.
+
+    Only the columns named in [COLUMNS] are read, one window of rows at a time,
+    into compact ``CustomerRow`` records. A window is re-read once it is older
+    than ``refresh_interval`` seconds, so edits made by other people are picked
+    up without downloading the sheet again.
+
+    ``pending`` is a sorted list of the loaded rows that are not yet handled, so
+    finding the next customer is a binary search instead of a scan. Each record
+    also carries its phone number in E.164 form, and ``phone_index`` maps every
+    normalized number to the sorted rows it appears on.
+
+    Statuses passed to ``mark`` are kept in ``local_status`` until the sheet
+    shows them, so re-reading a window before a queued write reaches the sheet
+    doesn't bring the row back as pending.
+    """
+
+    def __init__(self, worksheet, columns, handled_statuses, window_size=2000, refresh_interval=60, country_code=""):
+        self.worksheet = worksheet
+        # [COLUMNS] is a configparser section, which also carries the [DEFAULT] keys.
+        self.column_headers = {key: columns[key] for key in COLUMN_KEYS}
+        self.headers = list(dict.fromkeys(self.column_headers.values()))
+        self.country_code = country_code
+        self.handled_statuses = set(handled_statuses)
+        self.window_size = max(1, int(window_size))
+        self.refresh_interval = float(refresh_interval)
+
+        self.col_index = {}
+        self.rows = {}
+        self.pending = []
+        self.phone_index = {}
+        self.local_status = {}
+        self.end_row = None
+        self._window_loaded_at = {}
+        # next_pending may run on a worker thread while mark() is called from the UI thread
+        # (or the asyncio loop in bulk mode). It guards the in-memory state only; Sheets
+        # reads happen outside it, so mark() never waits on the network.
+        self._lock = threading.RLock()
+
+    @property
+    def status_col(self):
+        return self.col_index[self.column_headers['status']]
+
+    def load(self):
+        """Resolves the configured headers to sheet columns. Rows are read lazily."""
+        header_row = self.worksheet.row_values(1)
+        missing = [h for h in self.headers if h not in header_row]
+        if missing:
+            raise ValueError(f"Column(s) not found in sheet header: {', '.join(missing)}")
+        self.col_index = {h: header_row.index(h) + 1 for h in self.headers}
+        self.rows.clear()
+        self.pending.clear()
+        self.phone_index.clear()
+        self._window_loaded_at.clear()
+        self.end_row = None
+        print(f"Row cache ready: {len(self.headers)} columns, window of {self.window_size} rows.")
+
+    def _window_start(self, row):
+        return 2 + ((row - 2) // self.window_size) * self.window_size
+
+    def _fetch_window(self, start):
+        """Reads the window starting at ``start`` and merges it into the cache.
+
+        The Sheets read happens without the lock, so ``mark`` never waits on the
+        network; only the merge into ``rows``, ``pending`` and ``phone_index`` is locked.
+        """
+        end = start + self.window_size - 1
+        ranges = [f"{column_letter(self.col_index[h])}{start}:{column_letter(self.col_index[h])}{end}"
+                  for h in self.headers]
+        columns = dict(zip(self.headers, self.worksheet.batch_get(ranges)))
+        fields = [(COLUMN_FIELDS[key], columns[header]) for key, header in self.column_headers.items()]
+
+        records = []
+        for offset in range(self.window_size):
+            values = {}
+            for field, cells in fields:
+                cell = cells[offset] if offset < len(cells) else None
+                values[field] = str(cell[0]).strip() if cell else ""
+            if not any(values.values()):
+                continue
+            record = CustomerRow(start + offset, **values)
+            record.phone_e164 = normalize_phone(record.phone, self.country_code)
+            records.append(record)
+        loaded_at = time.monotonic()
+
+        with self._lock:
+            self._merge_window(start, records, loaded_at)
+
+    def _merge_window(self, start, records, loaded_at):
+        end = start + self.window_size - 1
+        for row in range(start, end + 1):
+            self._unindex(row)
+        window_pending = []
+        for record in records:
+            row = record.row_index
+            local = self.local_status.pop(row, None)
+            if local is not None and not record.status:
+                record.status = local
+                self.local_status[row] = local
+            self.rows[row] = record
+            if record.phone_e164:
+                bisect.insort(self.phone_index.setdefault(record.phone_e164, []), row)
+            if self.is_pending(record):
+                window_pending.append(row)
+        self.pending[bisect.bisect_left(self.pending, start):bisect.bisect_right(self.pending, end)] = window_pending
+
+        self._window_loaded_at[start] = loaded_at
+        if not records:
+            # Only a window with no filled rows at all ends the data; blank rows inside it are just gaps.
+            self.end_row = start - 1
+        elif self.end_row is not None and self.end_row <= end:
+            self.end_row = None
+
+    def _unindex(self, row):
+        old = self.rows.pop(row, None)
+        if old is not None and old.phone_e164:
+            rows = self.phone_index.get(old.phone_e164, [])
+            index = bisect.bisect_left(rows, row)
+            if index < len(rows) and rows[index] == row:
+                rows.pop(index)
+            if not rows:
+                self.phone_index.pop(old.phone_e164, None)
+
+    def duplicate_rows(self, record):
+        """All loaded rows sharing ``record``'s normalized phone number, in sheet order."""
+        return list(self.phone_index.get(record.phone_e164, ()))
+
+    def is_duplicate(self, record):
+        """True if the same normalized number appears on an earlier row."""
+        rows = self.phone_index.get(record.phone_e164)
+        return bool(rows) and rows[0] < record.row_index
+
+    def _ensure_fresh(self, row):
+        """Reads ``row``'s window if it is missing or stale. Call without holding the lock."""
+        start = self._window_start(row)
+        with self._lock:
+            loaded_at = self._window_loaded_at.get(start)
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_interval:
+            self._fetch_window(start)
+        return start
+
+    def is_pending(self, record):
+        return record.status not in self.handled_statuses
+
+    def next_pending(self, after_row=1):
+        """Returns the first pending record below ``after_row``, or None."""
+        row = max(after_row + 1, 2)
+        while True:
+            window_end = self._ensure_fresh(row) + self.window_size - 1
+            with self._lock:
+                if self.end_row is not None and row > self.end_row:
+                    return None
+                index = bisect.bisect_left(self.pending, row)
+                if index < len(self.pending) and self.pending[index] <= window_end:
+                    return self.rows[self.pending[index]]
+            row = window_end + 1
+
+    def iter_pending(self, after_row=1, keep=True):
+        """Yields every pending record below ``after_row`` in sheet order.
+
+        With ``keep=False`` each window is dropped from the cache once the
+        iteration has moved past it, so memory stays at one window however
+        long the sheet is.
+        """
+        row = max(after_row + 1, 2)
+        while True:
+            start = self._ensure_fresh(row)
+            end = start + self.window_size - 1
+            with self._lock:
+                past_end = self.end_row is not None and row > self.end_row
+                window = [] if past_end else [self.rows[r] for r in self.pending[
+                    bisect.bisect_left(self.pending, row):bisect.bisect_right(self.pending, end)]]
+            for record in window:
+                if self.is_pending(record):
+                    yield record
+            if not keep:
+                with self._lock:
+                    self._drop_window(start)
+            if past_end: return
+            row = end + 1
+
+    def _drop_window(self, start):
+        end = start + self.window_size - 1
+        for row in range(start, end + 1):
+            self._unindex(row)
+        del self.pending[bisect.bisect_left(self.pending, start):bisect.bisect_right(self.pending, end)]
+        self._window_loaded_at.pop(start, None)
+
+    def mark(self, row, status_text):
+        """Records a status written by this app so the cache doesn't serve the row again."""
+        with self._lock:
+            self.local_status[row] = status_text
+            record = self.rows.get(row)
+            if record is None: return
+            record.status = status_text
+            index = bisect.bisect_left(self.pending, row)
+            listed = index < len(self.pending) and self.pending[index] == row
+            if self.is_pending(record) and not listed:
+                self.pending.insert(index, row)
+            elif not self.is_pending(record) and listed:
+                self.pending.pop(index)
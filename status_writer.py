@@ -0,0 +1,125 @@
+import threading
+import time
+
+from sheet_cache import column_letter
+
+
+class StatusWriter:
+    """Write-behind queue for status cells.
+
+    Writes are collected in memory and sent to the sheet from a background thread
+    as a single ``batch_update`` every ``flush_interval`` seconds. A failed batch
+    is retried on the next cycle; after ``max_attempts`` failures the writes are
+    moved to ``failed`` so the app can report them.
+
+    With a ``journal``, each write is recorded there before it is queued and
+    acknowledged once the sheet accepts it, so nothing is lost on a crash.
+    """
+
+    def __init__(self, worksheet, status_col, flush_interval=2.0, max_batch=500, max_attempts=3, journal=None):
+        self.worksheet = worksheet
+        self.journal = journal
+        self.status_col_letter = column_letter(status_col)
+        self.flush_interval = float(flush_interval)
+        self.max_batch = max(1, int(max_batch))
+        self.max_attempts = max(1, int(max_attempts))
+
+        self.pending = {}
+        self.attempts = {}
+        self.failed = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="StatusWriter", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, row, status_text):
+        """Queues a status write. A later write to the same row replaces an unsent one."""
+        if self.journal:
+            self.journal.record(row, status_text)
+        with self._lock:
+            self.pending[row] = status_text
+            if len(self.pending) >= self.max_batch:
+                self._wake.set()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self.pending)
+
+    def take_failures(self):
+        """Returns and clears the writes that could not be saved as (row, status, error)."""
+        with self._lock:
+            failures, self.failed = self.failed, []
+        return failures
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Sends every queued write now. Safe to call from any thread."""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self.pending:
+                        return
+                    rows = sorted(self.pending)[:self.max_batch]
+                    batch = {row: self.pending.pop(row) for row in rows}
+
+                data = [{'range': f"{self.status_col_letter}{row}", 'values': [[status]]}
+                        for row, status in batch.items()]
+                try:
+                    self.worksheet.batch_update(data)
+                except Exception as e:
+                    self._requeue(batch, e)
+                    return
+                with self._lock:
+                    for row in batch:
+                        self.attempts.pop(row, None)
+                if self.journal:
+                    self._acknowledge(batch)
+                print(f"Wrote {len(batch)} status update(s) to the sheet.")
+
+    def _acknowledge(self, batch):
+        try:
+            self.journal.acknowledge(batch)
+        except Exception as e:
+            # The write itself succeeded; at worst it is replayed once more on the next start.
+            print(f"Could not update the write journal: {e}")
+
+    def _requeue(self, batch, error):
+        print(f"Status batch of {len(batch)} failed: {error}")
+        with self._lock:
+            for row, status in batch.items():
+                if row in self.pending:
+                    # A newer status was queued while this batch was in flight.
+                    continue
+                attempts = self.attempts.get(row, 0) + 1
+                if attempts >= self.max_attempts:
+                    self.attempts.pop(row, None)
+                    self.failed.append((row, status, str(error)))
+                else:
+                    self.attempts[row] = attempts
+                    self.pending[row] = status
+
+    def close(self, timeout=10):
+        """Stops the background thread and makes a final attempt to write everything queued.
+
+        Returns the writes that could not be saved.
+        """
+        self._stopped = True
+        self._wake.set()
+        self._thread.join(timeout)
+        deadline = time.monotonic() + timeout
+        while self.pending_count() and time.monotonic() < deadline:
+            self.flush()
+            if self.pending_count():
+                time.sleep(0.5)
+        with self._lock:
+            for row, status in self.pending.items():
+                self.failed.append((row, status, "Not written before closing."))
+            self.pending.clear()
+        return self.take_failures()
@@ -0,0 +1,54 @@
+import string
+from datetime import datetime
+
+# Fields a template may use; each is filled from the customer row except the greeting word.
+TEMPLATE_FIELDS = ('greeting', 'name', 'phone', 'user_id', 'last_login')
+
+DEFAULT_TEMPLATES = {
+    'message_1': "Selamat {greeting} ka {name}",
+    'message_2': ("ingin konfirmasi mengenai ID kaka *{user_id}* \n"
+                  "sejak *{last_login}*\nDi situs Amor77\n"
+                  "belum dimainkan ya ka ? apakah ada kendala ?"),
+}
+
+
+def get_time_based_greeting(at=None):
+    """Greeting word for the time of day at ``at`` (default: now)."""
+    h = (at or datetime.now()).hour
+    if 4 <= h < 10: return "pagi"
+    elif 10 <= h < 15: return "siang"
+    elif 15 <= h < 18: return "sore"
+    else: return "malam"
+
+
+class MessageTemplate:
+    """A message with ``{field}`` placeholders, parsed once and rendered per customer."""
+
+    def __init__(self, text):
+        self.text = text
+        self._parts = []
+        for literal, field, format_spec, conversion in string.Formatter().parse(text):
+            if field is not None and (field not in TEMPLATE_FIELDS or format_spec or conversion):
+                raise ValueError(f"Unknown template field '{{{field}}}', expected one of: {', '.join(TEMPLATE_FIELDS)}")
+            self._parts.append((literal, field))
+
+    def render(self, record, greeting):
+        values = {'greeting': greeting, 'name': record.name, 'phone': record.phone,
+                  'user_id': record.user_id, 'last_login': record.last_login}
+        return "".join(literal + (values[field] if field else "") for literal, field in self._parts)
+
+
+class MessageTemplates:
+    """Message 1 and 2 from the [TEMPLATES] section, falling back to the built-in texts."""
+
+    def __init__(self, message_1, message_2):
+        self.templates = {1: MessageTemplate(message_1), 2: MessageTemplate(message_2)}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get('TEMPLATES', 'message_1', fallback=DEFAULT_TEMPLATES['message_1']),
+                   config.get('TEMPLATES', 'message_2', fallback=DEFAULT_TEMPLATES['message_2']))
+
+    def render(self, record, greeting):
+        """Returns ``{1: message_1, 2: message_2}`` for ``record``."""
+        return {number: template.render(record, greeting) for number, template in self.templates.items()}
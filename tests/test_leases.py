@@ -0,0 +1,62 @@
+import time
+
+from bench.fake_sheet import FakeWorksheet
+from leases import LeaseManager, LeasedRowCache, SQLiteLeaseBackend
+from sheet_cache import SheetRowCache
+
+COLUMNS = {'phone': 'PHONE NUMBER', 'name': 'NAMA', 'id': 'USERNAME', 'last_login': 'LAST LOGIN', 'status': 'TERKIRIM'}
+TTL = 0.5
+
+
+def make_operator(worksheet, path, operator):
+    cache = SheetRowCache(worksheet, COLUMNS, ['SENT', 'INVALID'], window_size=5, country_code='62')
+    cache.load()
+    leases = LeaseManager(SQLiteLeaseBackend(str(path), 'sheet'), operator, block_size=5, ttl=TTL)
+    return LeasedRowCache(cache, leases)
+
+
+def work_through(cache, after_row=1):
+    rows = []
+    while True:
+        record = cache.next_pending(after_row)
+        if record is None:
+            return rows
+        rows.append(record.row_index)
+        cache.mark(record.row_index, 'SENT')
+        after_row = record.row_index
+
+
+def test_skipped_block_is_picked_up_once_its_lease_expires(tmp_path):
+    worksheet = FakeWorksheet.generate(15)  # rows 2-16, blocks 2, 7 and 12
+    path = tmp_path / "leases.sqlite3"
+    first = make_operator(worksheet, path, "first")
+    second = make_operator(worksheet, path, "second")
+    try:
+        assert first.next_pending().row_index == 2  # first claims rows 2-6, then goes away
+
+        assert work_through(second) == list(range(7, 17))
+        assert second.skipped_blocks == {2}
+
+        time.sleep(TTL + 0.1)
+        assert work_through(second, 16) == list(range(2, 7))
+        assert second.skipped_blocks == set()
+    finally:
+        first.leases.backend.close()
+        second.leases.close()
+
+
+def test_skipped_block_finished_by_its_holder_is_dropped(tmp_path):
+    worksheet = FakeWorksheet.generate(10)  # rows 2-11, blocks 2 and 7
+    path = tmp_path / "leases.sqlite3"
+    first = make_operator(worksheet, path, "first")
+    second = make_operator(worksheet, path, "second")
+    try:
+        assert first.next_pending().row_index == 2
+        assert second.next_pending().row_index == 7
+        for row in range(2, 7):
+            second.mark(row, 'SENT')  # as if a refresh had picked up first's statuses
+        assert work_through(second, 7) == list(range(8, 12))
+        assert second.skipped_blocks == set()
+    finally:
+        first.leases.close()
+        second.leases.close()
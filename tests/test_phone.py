@@ -0,0 +1,28 @@
+import pytest
+
+from phone import gateway_number, normalize_phone
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("0812-345-678", "+62812345678"),
+    ("812345678", "+62812345678"),
+    ("62812345678", "+62812345678"),
+    ("+62 812 345 678", "+62812345678"),
+    ("0062812345678", "+62812345678"),
+    ("+1 555 123 4567", "+15551234567"),
+    ("0812345", "+62812345"),
+])
+def test_normalize_phone(raw, expected):
+    assert normalize_phone(raw, "62") == expected
+
+
+def test_normalize_phone_without_digits():
+    assert normalize_phone("", "62") is None
+    assert normalize_phone("n/a", "62") is None
+
+
+@pytest.mark.parametrize("raw", ["+1 555 123 4567", "0812345", "0812-345-678", "+44 20 7946 0958"])
+def test_e164_round_trip_is_stable(raw):
+    e164 = normalize_phone(raw, "62")
+    assert normalize_phone(e164, "62") == e164
+    assert gateway_number(e164) == e164[1:]
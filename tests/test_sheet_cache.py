@@ -0,0 +1,35 @@
+from bench.fake_sheet import FakeWorksheet
+from sheet_cache import SheetRowCache
+
+COLUMNS = {'phone': 'PHONE NUMBER', 'name': 'NAMA', 'id': 'USERNAME', 'last_login': 'LAST LOGIN', 'status': 'TERKIRIM'}
+
+
+def make_cache(worksheet, window_size=5):
+    cache = SheetRowCache(worksheet, COLUMNS, ['SENT', 'INVALID'], window_size=window_size, country_code='62')
+    cache.load()
+    return cache
+
+
+def served_rows(cache):
+    rows, after_row = [], 1
+    while True:
+        record = cache.next_pending(after_row)
+        if record is None:
+            return rows
+        rows.append(record.row_index)
+        after_row = record.row_index
+
+
+def test_blank_row_at_window_boundary_does_not_end_the_data():
+    worksheet = FakeWorksheet.generate(30)
+    worksheet.data[5] = [""] * 5  # sheet row 6, the last row of the first window
+    cache = make_cache(worksheet)
+    expected = [row for row in range(2, 32) if row != 6]
+    assert served_rows(cache) == expected
+    assert [r.row_index for r in make_cache(worksheet).iter_pending(keep=False)] == expected
+
+
+def test_empty_window_ends_the_data():
+    cache = make_cache(FakeWorksheet.generate(8))
+    assert served_rows(cache) == list(range(2, 10))
+    assert cache.next_pending(9) is None
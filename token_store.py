@@ -0,0 +1,100 @@
+import base64
+import ctypes
+import json
+import os
+import time
+
+CRYPTPROTECT_UI_FORBIDDEN = 0x1
+
+
+class _DataBlob(ctypes.Structure):
+    _fields_ = [("cbData", ctypes.c_uint32), ("pbData", ctypes.POINTER(ctypes.c_char))]
+
+
+def _dpapi(protect, data):
+    """Encrypts (or decrypts) ``data`` with Windows DPAPI, tied to the current user account."""
+    buffer = ctypes.create_string_buffer(data, len(data))
+    blob_in = _DataBlob(len(data), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char)))
+    blob_out = _DataBlob()
+    crypt32 = ctypes.windll.crypt32
+    func = crypt32.CryptProtectData if protect else crypt32.CryptUnprotectData
+    if not func(ctypes.byref(blob_in), None, None, None, None, CRYPTPROTECT_UI_FORBIDDEN, ctypes.byref(blob_out)):
+        raise ctypes.WinError()
+    try:
+        return ctypes.string_at(blob_out.pbData, blob_out.cbData)
+    finally:
+        ctypes.windll.kernel32.LocalFree(blob_out.pbData)
+
+
+def token_expiry(token, default_ttl):
+    """Expiry time of ``token``: the ``exp`` claim if it is a JWT, else ``default_ttl`` seconds from now."""
+    parts = str(token).split(".")
+    if len(parts) == 3:
+        try:
+            payload = parts[1] + "=" * (-len(parts[1]) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+            if isinstance(exp, (int, float)):
+                return float(exp)
+        except (ValueError, AttributeError):
+            pass
+    return time.time() + default_ttl
+
+
+class TokenStore:
+    """Keeps the gateway token on disk so the app can skip the login on the next start.
+
+    The file holds one token per gateway URL and username. On Windows it is
+    encrypted with DPAPI, so only the same Windows user account can read it;
+    elsewhere it is a plain file with ``0600`` permissions. A token is reused until ``margin`` seconds before
+    it expires, and forgotten as soon as the gateway rejects it.
+    """
+
+    def __init__(self, path, default_ttl=12 * 3600, margin=300):
+        self.path = path
+        self.default_ttl = float(default_ttl)
+        self.margin = float(margin)
+
+    def _key(self, base_url, username):
+        return f"{base_url.rstrip('/')}|{username}"
+
+    def _read(self):
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            if os.name == "nt":
+                raw = _dpapi(False, raw)
+            return json.loads(raw.decode("utf-8"))
+        except (OSError, ValueError):
+            # Missing, unreadable, or written by another user or an older version: log in again.
+            return {}
+
+    def _write(self, data):
+        raw = json.dumps(data).encode("utf-8")
+        if os.name == "nt":
+            raw = _dpapi(True, raw)
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+    def load(self, base_url, username):
+        """Returns the stored token if it is still valid, else None."""
+        entry = self._read().get(self._key(base_url, username))
+        if not entry or entry.get("expires_at", 0) - self.margin <= time.time():
+            return None
+        return entry.get("token")
+
+    def save(self, base_url, username, token):
+        data = self._read()
+        data[self._key(base_url, username)] = {"token": token, "expires_at": token_expiry(token, self.default_ttl)}
+        self._write(data)
+
+    def forget(self, base_url, username=None):
+        """Drops the token for ``username``, or every token for ``base_url``."""
+        data = self._read()
+        prefix = self._key(base_url, username) if username is not None else self._key(base_url, "")
+        remaining = {k: v for k, v in data.items() if not (k == prefix or (username is None and k.startswith(prefix)))}
+        if remaining != data:
+            self._write(remaining)
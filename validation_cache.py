@@ -0,0 +1,92 @@
+import sqlite3
+import threading
+import time
+
+
+class ValidationCache:
+    """On-disk SQLite cache of phone validation results.
+
+    Results are keyed by the number in E.164 form, exactly as passed in.
+    Registered and unregistered results expire separately: a number that was not
+    on WhatsApp may sign up later, so negative results usually get a shorter TTL.
+    Expired results are deleted each time the cache is opened.
+
+    The app and --validate-all may share the file, so a lookup or store that
+    fails (e.g. "database is locked") is treated as a miss or skipped rather
+    than failing the phone check.
+    """
+
+    def __init__(self, path, positive_ttl=7 * 86400, negative_ttl=86400):
+        self.path = path
+        self.positive_ttl = float(positive_ttl)
+        self.negative_ttl = float(negative_ttl)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS phone_validation ("
+                " phone TEXT NOT NULL,"
+                " country_code TEXT NOT NULL,"
+                " is_registered INTEGER NOT NULL,"
+                " checked_at REAL NOT NULL,"
+                " PRIMARY KEY (phone, country_code))")
+        removed = self.purge(expired_only=True)
+        if removed:
+            print(f"Removed {removed} expired validation result(s) from the cache.")
+
+    def get(self, phone_e164, country_code):
+        """Returns the cached True/False result, or None if missing, expired or unreadable."""
+        key = str(phone_e164)
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT is_registered, checked_at FROM phone_validation WHERE phone = ? AND country_code = ?",
+                    (key, str(country_code))).fetchone()
+            except sqlite3.Error as e:
+                print(f"Validation cache lookup failed: {e}")
+                row = None
+            if row is not None:
+                is_registered, checked_at = bool(row[0]), row[1]
+                ttl = self.positive_ttl if is_registered else self.negative_ttl
+                if time.time() - checked_at <= ttl:
+                    self.hits += 1
+                    return is_registered
+            self.misses += 1
+            return None
+
+    def put(self, phone_e164, country_code, is_registered):
+        key = str(phone_e164)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO phone_validation (phone, country_code, is_registered, checked_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, str(country_code), int(bool(is_registered)), time.time()))
+        except sqlite3.Error as e:
+            print(f"Could not store validation result for {key}: {e}")
+
+    def purge(self, expired_only=False):
+        """Deletes cached results (only the expired ones if ``expired_only``). Returns the count."""
+        with self._lock, self._conn:
+            if expired_only:
+                now = time.time()
+                cursor = self._conn.execute(
+                    "DELETE FROM phone_validation WHERE (is_registered = 1 AND checked_at < ?)"
+                    " OR (is_registered = 0 AND checked_at < ?)",
+                    (now - self.positive_ttl, now - self.negative_ttl))
+            else:
+                cursor = self._conn.execute("DELETE FROM phone_validation")
+            return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM phone_validation").fetchone()[0]
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        return {"entries": size, "hits": self.hits, "misses": self.misses, "hit_rate": hit_rate}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
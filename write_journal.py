@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+import time
+
+
+class WriteJournal:
+    """SQLite write-ahead journal of status writes and the operator's position.
+
+    Every status change is recorded here before it is queued for the sheet and
+    removed once the sheet has accepted it, so writes that were still queued or
+    had failed when the app stopped can be replayed on the next start. The row
+    of the customer on screen is kept as well, so a restart can pick up where
+    the operator left off instead of scanning the sheet from the top.
+
+    Entries are keyed by ``sheet_key`` so switching worksheets in config.ini
+    never replays or resumes against the wrong sheet.
+    """
+
+    def __init__(self, path, sheet_key):
+        self.path = path
+        self.sheet_key = sheet_key
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS status_writes ("
+                " sheet TEXT NOT NULL,"
+                " row INTEGER NOT NULL,"
+                " status TEXT NOT NULL,"
+                " queued_at REAL NOT NULL,"
+                " PRIMARY KEY (sheet, row))")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cursor ("
+                " sheet TEXT PRIMARY KEY,"
+                " row INTEGER NOT NULL,"
+                " updated_at REAL NOT NULL)")
+
+    def record(self, row, status_text):
+        """Records a status write before it is sent. A later write to the same row replaces it."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO status_writes (sheet, row, status, queued_at) VALUES (?, ?, ?, ?)",
+                (self.sheet_key, row, status_text, time.time()))
+
+    def acknowledge(self, batch):
+        """Forgets writes the sheet has accepted; ``batch`` maps row -> status that was written."""
+        with self._lock, self._conn:
+            # Only matching statuses, so a newer write queued meanwhile stays journaled.
+            self._conn.executemany(
+                "DELETE FROM status_writes WHERE sheet = ? AND row = ? AND status = ?",
+                [(self.sheet_key, row, status) for row, status in batch.items()])
+
+    def unflushed(self):
+        """Returns the journaled writes the sheet never confirmed, as (row, status) in row order."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT row, status FROM status_writes WHERE sheet = ? ORDER BY row",
+                (self.sheet_key,)).fetchall()
+
+    def save_cursor(self, row):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cursor (sheet, row, updated_at) VALUES (?, ?, ?)",
+                (self.sheet_key, row, time.time()))
+
+    def cursor(self):
+        """Returns the row of the last customer shown, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT row FROM cursor WHERE sheet = ?", (self.sheet_key,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()